@@ -0,0 +1,167 @@
+"""Командная строка hw2: python cli.py <команда> [параметры].
+
+Команды: profile, train, evaluate, score, plot. Тяжелые библиотеки (pandas, sklearn,
+matplotlib) импортируются внутри команд, которым они нужны: --help и разбор аргументов
+не загружают ничего, кроме argparse, а score обходится NumPy.
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+DEFAULT_MODEL = 'credit_limit_model.json'
+PLOT_STAGES = ['correlation_plot', 'target_plot', 'prediction_plot']
+
+def _check_data(path: str) -> bool:
+    if os.path.exists(path):
+        return True
+    print(f"Файл {path} не найден")
+    print("Скачайте датасет: https://www.kaggle.com/datasets/sakshigoyal7/credit-card-customers")
+    return False
+
+def cmd_profile(args) -> int:
+    """Профиль данных: размер, пропуски, статистики колонок (pandas, без sklearn и matplotlib)."""
+    import data_loader
+    import data_processing
+
+    if not _check_data(args.data):
+        return 1
+    if args.chunksize:
+        # Один проход по чанкам: память не зависит от размера файла
+        data_profile = data_processing.profile_chunks(data_loader.iter_credit_card_data(args.data, args.chunksize))
+        data_processing.print_missing_report(data_profile)
+        print("\nСтатистики колонок:")
+        print(data_profile.summary().to_string())
+        return 0
+    df = data_loader.load_credit_card_data_cached(args.data, use_cache=not args.no_cache)
+    if df is None:
+        return 1
+    data_processing.explore_data(df, profile=True)
+    return 0
+
+def cmd_train(args) -> int:
+    """Обучение и экспорт модели через конвейер main.py без этапов графиков.
+
+    Метрики и коэффициенты печатаются при каждом запуске (этапы без кэша), артефакт
+    пересоздается, если его нет.
+    """
+    import main
+
+    if not _check_data(args.data):
+        return 1
+    pipeline = main.build_pipeline(args.data, use_cache=not args.no_cache, force=args.force,
+                                   plots=False, model_path=args.model)
+    pipeline.run(targets=['evaluate', 'coefficients', 'export'], explain=args.explain)
+    return 0
+
+def cmd_evaluate(args) -> int:
+    """Оценка экспортированной модели на файле данных."""
+    import data_loader
+    import data_processing
+    import ml_module
+    import scoring
+
+    if not _check_data(args.data):
+        return 1
+    model = scoring.load_model(args.model)
+    df = data_loader.load_credit_card_data_cached(args.data, use_cache=not args.no_cache)
+    if df is None:
+        return 1
+    # prepare_data отбирает строки (выбросы) и целевую; признаки кодирует сама модель -
+    # по категориям из артефакта, а не по встреченным в этом файле
+    X, y = data_processing.prepare_data(df)
+    ml_module.evaluate_model(y, model.predict(df.loc[y.index]), n_bootstrap=args.bootstrap)
+    return 0
+
+def _read_records(source, fmt: str):
+    if fmt == 'csv':
+        import csv
+        yield from csv.DictReader(source)
+        return
+    import json
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+def cmd_score(args) -> int:
+    """Предсказания по записям клиентов (JSON Lines или CSV) - только NumPy."""
+    import scoring
+
+    model = scoring.load_model(args.model)
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        batch = []
+        for record in _read_records(source, fmt):
+            batch.append(record)
+            if len(batch) >= args.batch_size:
+                output.writelines(f"{prediction:.6f}\n" for prediction in model.predict(batch))
+                batch = []
+        if batch:
+            output.writelines(f"{prediction:.6f}\n" for prediction in model.predict(batch))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+def cmd_plot(args) -> int:
+    """Графики конвейера (входы этапов берутся из кэша, сами графики строятся всегда)."""
+    import rendering
+
+    if args.output_dir:
+        rendering.configure(args.output_dir, args.plot_format)
+    import main
+
+    if not _check_data(args.data):
+        return 1
+    pipeline = main.build_pipeline(args.data, use_cache=not args.no_cache, model_path=args.model)
+    main.render_plots(pipeline, args.plots or PLOT_STAGES)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description='Прогнозирование кредитного лимита')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, handler, help_text: str, data: bool = True) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text, description=help_text)
+        if data:
+            command.add_argument('data', nargs='?', default=DEFAULT_DATA, help='CSV с данными (по умолчанию BankChurners.csv рядом с cli.py)')
+            command.add_argument('--no-cache', action='store_true', help='читать CSV без колоночного кэша')
+        command.set_defaults(handler=handler)
+        return command
+
+    profile = add_command('profile', cmd_profile, 'профиль данных и отчет о пропусках')
+    profile.add_argument('--chunksize', type=int, default=0, help='профиль по чанкам заданного размера')
+
+    train = add_command('train', cmd_train, 'обучение и экспорт модели')
+    train.add_argument('--model', default=DEFAULT_MODEL, help='путь артефакта модели')
+    train.add_argument('--force', action='store_true', help='пересчитать все этапы')
+    train.add_argument('--explain', action='store_true', help='показать, какие этапы взяты из кэша')
+
+    evaluate = add_command('evaluate', cmd_evaluate, 'оценка экспортированной модели на данных')
+    evaluate.add_argument('--model', default=DEFAULT_MODEL, help='путь артефакта модели')
+    evaluate.add_argument('--bootstrap', type=int, default=0, help='число бутстреп-выборок для интервалов')
+
+    score = add_command('score', cmd_score, 'предсказания по записям клиентов', data=False)
+    score.add_argument('input', nargs='?', default='-', help='JSON Lines или CSV с записями (- для stdin)')
+    score.add_argument('--model', default=DEFAULT_MODEL, help='путь артефакта модели')
+    score.add_argument('--format', choices=['jsonl', 'csv'], help='формат входа (по умолчанию по расширению)')
+    score.add_argument('--output', default='-', help='файл для предсказаний (- для stdout)')
+    score.add_argument('--batch-size', type=int, default=10_000, help='записей на одно предсказание')
+
+    plot = add_command('plot', cmd_plot, 'графики конвейера')
+    plot.add_argument('--model', default=DEFAULT_MODEL, help='путь артефакта модели')
+    plot.add_argument('--plots', nargs='+', choices=PLOT_STAGES, help='какие графики строить')
+    plot.add_argument('--output-dir', help='сохранять графики в каталог вместо показа')
+    plot.add_argument('--plot-format', choices=['png', 'svg'], default='png', help='формат файлов графиков')
+    return parser
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
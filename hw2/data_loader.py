@@ -1,9 +1,107 @@
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+from instrumentation import instrument
+from pandas.api.types import CategoricalDtype
+
+# Каталог колоночного кэша (создается рядом с CSV) и версия его формата
+CACHE_DIR_NAME = '.data_cache'
+CACHE_VERSION = 1
+
+# Колонки Naive_Bayes рекомендуют удалить до исследования - в типизированном режиме их не читаем вовсе
+NAIVE_BAYES_COLUMNS = [
+    'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_1',
+    'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_2',
+]
+
+# Категории перечислены в алфавитном порядке - так же, как их упорядочивает astype('category'),
+# поэтому коды cat.codes совпадают с кодами из prepare_data
+CATEGORIES = {
+    'Attrition_Flag': ['Attrited Customer', 'Existing Customer'],
+    'Gender': ['F', 'M'],
+    'Education_Level': ['College', 'Doctorate', 'Graduate', 'High School', 'Post-Graduate', 'Uneducated', 'Unknown'],
+    'Marital_Status': ['Divorced', 'Married', 'Single', 'Unknown'],
+    'Income_Category': ['$120K +', '$40K - $60K', '$60K - $80K', '$80K - $120K', 'Less than $40K', 'Unknown'],
+    'Card_Category': ['Blue', 'Gold', 'Platinum', 'Silver'],
+}
+
+# Схема BankChurners.csv: категориальные колонки с фиксированным набором категорий
+# (одинаковым для всех чанков), целые - int32, дробные - float32
+CREDIT_CARD_SCHEMA = {
+    'CLIENTNUM': 'int32',
+    'Attrition_Flag': CategoricalDtype(CATEGORIES['Attrition_Flag']),
+    'Customer_Age': 'int32',
+    'Gender': CategoricalDtype(CATEGORIES['Gender']),
+    'Dependent_count': 'int32',
+    'Education_Level': CategoricalDtype(CATEGORIES['Education_Level']),
+    'Marital_Status': CategoricalDtype(CATEGORIES['Marital_Status']),
+    'Income_Category': CategoricalDtype(CATEGORIES['Income_Category']),
+    'Card_Category': CategoricalDtype(CATEGORIES['Card_Category']),
+    'Months_on_book': 'int32',
+    'Total_Relationship_Count': 'int32',
+    'Months_Inactive_12_mon': 'int32',
+    'Contacts_Count_12_mon': 'int32',
+    'Credit_Limit': 'float32',
+    'Total_Revolving_Bal': 'int32',
+    'Avg_Open_To_Buy': 'float32',
+    'Total_Amt_Chng_Q4_Q1': 'float32',
+    'Total_Trans_Amt': 'int32',
+    'Total_Trans_Ct': 'int32',
+    'Total_Ct_Chng_Q4_Q1': 'float32',
+    'Avg_Utilization_Ratio': 'float32',
+}
+
+def _read_csv_options(columns: list = None) -> dict:
+    """Параметры read_csv для типизированной загрузки.
+
+    Категориальные колонки читаются с категориями из данных: значение вне схемы
+    иначе молча превратилось бы в NaN. Схема применяется в _cast_categories.
+    """
+    usecols = list(CREDIT_CARD_SCHEMA) if columns is None else list(columns)
+    return {
+        'usecols': usecols,
+        'dtype': {col: 'category' if col in CATEGORIES else CREDIT_CARD_SCHEMA[col] for col in usecols},
+    }
+
+def _check_categories(df: pd.DataFrame):
+    """ValueError, если в категориальной колонке есть значения вне CATEGORIES."""
+    for col in df.columns:
+        if col not in CATEGORIES:
+            continue
+        values = df[col]
+        seen = values.cat.categories if isinstance(values.dtype, CategoricalDtype) else values.dropna().unique()
+        unknown = sorted(set(seen) - set(CATEGORIES[col]), key=str)
+        if unknown:
+            raise ValueError(f"Колонка {col}: значения вне схемы {unknown}")
+
+def _cast_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Проверка и приведение категориальных колонок к категориям схемы."""
+    _check_categories(df)
+    return df.astype({col: CREDIT_CARD_SCHEMA[col] for col in df.columns if col in CATEGORIES})
 
-def load_credit_card_data(file_path: str = 'BankChurners.csv') -> pd.DataFrame:
-    """Загрузка данных о клиентах кредитных карт."""
+@instrument()
+def load_credit_card_data(file_path: str = 'BankChurners.csv', typed: bool = False,
+                          columns: list = None) -> pd.DataFrame:
+    """Загрузка данных о клиентах кредитных карт.
+
+    При typed=True колонки читаются по схеме CREDIT_CARD_SCHEMA (category/int32/float32),
+    колонки Naive_Bayes не разбираются. columns ограничивает набор читаемых колонок.
+    """
     try:
-        df = pd.read_csv(file_path)
+        if typed or columns is not None:
+            df = _cast_categories(pd.read_csv(file_path, **_read_csv_options(columns)))
+        else:
+            df = pd.read_csv(file_path)
         print(f"Данные загружены. Размер: {df.shape}")
         return df
     except FileNotFoundError:
@@ -11,4 +109,299 @@ def load_credit_card_data(file_path: str = 'BankChurners.csv') -> pd.DataFrame:
         return None
     except Exception as e:
         print(f"Ошибка загрузки: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def iter_credit_card_data(file_path: str = 'BankChurners.csv', chunksize: int = 100_000,
+                          columns: list = None):
+    """Потоковая загрузка: генератор типизированных DataFrame не более chunksize строк.
+
+    Все чанки имеют одинаковые типы колонок, поэтому их можно объединять через pd.concat
+    без перехода категорий в object. Ошибка чтения посреди файла пробрасывается дальше:
+    потребитель не должен принять обрезанный поток за полный набор данных.
+    """
+    try:
+        with pd.read_csv(file_path, chunksize=chunksize, **_read_csv_options(columns)) as reader:
+            for chunk in reader:
+                yield _cast_categories(chunk)
+    except FileNotFoundError:
+        print(f"Файл {file_path} не найден")
+        raise
+    except Exception as e:
+        print(f"Ошибка загрузки: {e}")
+        raise
+
+def _file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 содержимого файла, читаем блоками."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_path(file_path: str, cache_dir: str, typed: bool, columns: list) -> str:
+    """Каталог кэша для конкретного файла и параметров загрузки."""
+    source = os.path.abspath(file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(source), CACHE_DIR_NAME)
+    key = json.dumps([source, typed, columns])
+    name = f"{os.path.basename(source)}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+    return os.path.join(cache_dir, name)
+
+def _source_fingerprint(file_path: str) -> dict:
+    """Путь, размер и mtime исходного файла."""
+    stat = os.stat(file_path)
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _read_cache(path: str, file_path: str):
+    """Чтение кэша, если он соответствует исходному файлу, иначе None."""
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    source = _source_fingerprint(file_path)
+    cached = meta['source']
+    if source['size'] != cached['size']:
+        return None
+    if source['mtime_ns'] != cached['mtime_ns']:
+        # Файл могли просто "потрогать" - сверяем содержимое по хэшу
+        if _file_sha256(file_path) != cached['sha256']:
+            return None
+        meta['source']['mtime_ns'] = source['mtime_ns']
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r')
+        kind = column['kind']
+        if kind == 'numeric':
+            data[column['name']] = values
+        elif kind == 'category':
+            data[column['name']] = pd.Categorical.from_codes(values, column['categories'])
+        else:
+            uniques = np.array(column['categories'] + [None], dtype=object)
+            data[column['name']] = uniques[values]
+    # copy=False: числовые колонки остаются отображенными в память, а не копируются в блоки
+    return pd.DataFrame(data, copy=False)
+
+def _write_cache(path: str, file_path: str, df: pd.DataFrame):
+    """Сохранение DataFrame в каталог .npy файлов (по файлу на колонку)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        if isinstance(series.dtype, CategoricalDtype):
+            values = series.cat.codes.to_numpy()
+            column = {'name': name, 'kind': 'category', 'categories': series.cat.categories.tolist()}
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy()
+            column = {'name': name, 'kind': 'numeric'}
+        else:
+            # Строковые колонки храним как коды; -1 (пропуск) указывает на None в конце словаря
+            values, uniques = pd.factorize(series)
+            column = {'name': name, 'kind': 'object', 'categories': uniques.tolist()}
+        np.save(os.path.join(tmp_path, f'{i}.npy'), values)
+        columns.append(column)
+
+    source = _source_fingerprint(file_path)
+    source['sha256'] = _file_sha256(file_path)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'source': source, 'columns': columns}, f, ensure_ascii=False)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+@instrument()
+def load_credit_card_data_cached(file_path: str = 'BankChurners.csv', typed: bool = False,
+                                 columns: list = None, use_cache: bool = True,
+                                 cache_dir: str = None) -> pd.DataFrame:
+    """Загрузка данных через колоночный кэш.
+
+    Кэш - каталог .npy файлов рядом с CSV (или в cache_dir). Ключ - путь, размер, mtime
+    и SHA-256 содержимого; при изменении CSV кэш пересобирается. При повторной загрузке
+    колонки отображаются в память (mmap) без разбора текста.
+    """
+    if not use_cache:
+        return load_credit_card_data(file_path, typed=typed, columns=columns)
+
+    path = _cache_path(file_path, cache_dir, typed, columns)
+    try:
+        df = _read_cache(path, file_path)
+        if df is not None:
+            print(f"Данные загружены из кэша. Размер: {df.shape}")
+            return df
+    except FileNotFoundError:
+        print(f"Файл {file_path} не найден")
+        return None
+    except Exception as e:
+        print(f"Кэш поврежден, пересобираем: {e}")
+
+    df = load_credit_card_data(file_path, typed=typed, columns=columns)
+    if df is not None:
+        try:
+            _write_cache(path, file_path, df)
+        except Exception as e:
+            print(f"Не удалось сохранить кэш: {e}")
+    return df
+
+def invalidate_cache(file_path: str = 'BankChurners.csv', cache_dir: str = None):
+    """Удаление всех кэшей для файла."""
+    source = os.path.abspath(file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(source), CACHE_DIR_NAME)
+    if not os.path.isdir(cache_dir):
+        return
+    prefix = f"{os.path.basename(source)}-"
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            print(f"Удален кэш: {name}")
+
+def compare_load_times(file_path: str = 'BankChurners.csv', typed: bool = False, repeat: int = 3) -> dict:
+    """Сравнение времени загрузки: разбор CSV, холодный кэш и теплый кэш."""
+    invalidate_cache(file_path)
+
+    start = time.perf_counter()
+    load_credit_card_data(file_path, typed=typed)
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_credit_card_data_cached(file_path, typed=typed)
+    cold_time = time.perf_counter() - start
+
+    warm_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_credit_card_data_cached(file_path, typed=typed)
+        warm_times.append(time.perf_counter() - start)
+    warm_time = min(warm_times)
+
+    print("=== Время загрузки ===")
+    print(f"Разбор CSV:         {parse_time * 1000:8.1f} мс")
+    print(f"Холодный кэш:       {cold_time * 1000:8.1f} мс")
+    print(f"Теплый кэш:         {warm_time * 1000:8.1f} мс (ускорение x{parse_time / warm_time:.1f})")
+    print("=" * 60)
+
+    return {'parse': parse_time, 'cold': cold_time, 'warm': warm_time}
+
+def _apply_schema(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """Приведение DataFrame, прочитанного не из CSV, к схеме CREDIT_CARD_SCHEMA."""
+    usecols = list(CREDIT_CARD_SCHEMA) if columns is None else list(columns)
+    _check_categories(df[usecols])
+    return df[usecols].astype({col: CREDIT_CARD_SCHEMA[col] for col in usecols})
+
+def _strip_gz(name: str) -> str:
+    """Имя файла в нижнем регистре без суффикса .gz."""
+    name = name.lower()
+    return name[:-3] if name.endswith('.gz') else name
+
+def _is_json(name: str) -> bool:
+    """JSON или JSON Lines (в том числе сжатые gzip)."""
+    return _strip_gz(name).endswith(('.json', '.jsonl'))
+
+def read_csv_source(source: str, columns: list = None) -> pd.DataFrame:
+    """Чтение CSV (сжатие .gz определяется по расширению)."""
+    return _cast_categories(pd.read_csv(source, **_read_csv_options(columns)))
+
+def read_json_source(source: str, columns: list = None) -> pd.DataFrame:
+    """Чтение JSON / JSON Lines (сжатие .gz определяется по расширению)."""
+    lines = _strip_gz(source).endswith('.jsonl')
+    return _apply_schema(pd.read_json(source, lines=lines), columns)
+
+def read_api_source(url: str, columns: list = None) -> pd.DataFrame:
+    """Чтение из HTTP API: ответ в формате CSV или JSON (по Content-Type или расширению).
+
+    Сжатый gzip ответ (Content-Encoding: gzip или расширение .gz) распаковывается.
+    """
+    with urllib.request.urlopen(url) as response:
+        content_type = response.headers.get('Content-Type', '')
+        compressed = response.headers.get('Content-Encoding', '').lower() == 'gzip'
+        body = response.read()
+    path = url.split('?', 1)[0]
+    if compressed or path.lower().endswith('.gz'):
+        body = gzip.decompress(body)
+    if 'json' in content_type or _is_json(path):
+        lines = _strip_gz(path).endswith('.jsonl') or 'ndjson' in content_type
+        return _apply_schema(pd.read_json(io.BytesIO(body), lines=lines), columns)
+    return _cast_categories(pd.read_csv(io.BytesIO(body), **_read_csv_options(columns)))
+
+# Читатели источников по схеме URL; можно добавить свой через register_reader.
+# Функции должны быть объявлены на уровне модуля - они передаются в дочерние процессы
+SOURCE_READERS = {
+    'http': read_api_source,
+    'https': read_api_source,
+}
+
+def register_reader(scheme: str, reader):
+    """Регистрация читателя для источников вида '<scheme>://...'."""
+    SOURCE_READERS[scheme] = reader
+
+def _read_source(source: str, columns: list, readers: dict) -> pd.DataFrame:
+    """Выбор читателя по схеме URL или расширению файла."""
+    if '://' in source:
+        scheme = source.split('://', 1)[0]
+        if scheme not in readers:
+            raise ValueError(f"Нет читателя для источника {source}")
+        return readers[scheme](source, columns)
+    if _is_json(source):
+        return read_json_source(source, columns)
+    return read_csv_source(source, columns)
+
+def _expand_sources(sources) -> list:
+    """Раскрытие glob-шаблонов в список источников."""
+    if isinstance(sources, str):
+        sources = [sources]
+    expanded = []
+    for source in sources:
+        if '://' in source or not glob.has_magic(source):
+            expanded.append(source)
+        else:
+            expanded.extend(sorted(glob.glob(source)))
+    return expanded
+
+def load_from_sources(sources, columns: list = None, processes: int = None,
+                      readers: dict = None) -> pd.DataFrame:
+    """Параллельная загрузка нескольких источников (CSV, CSV.gz, JSON, JSON Lines, API).
+
+    sources - glob-шаблон или список путей/URL. Источники разбираются в пуле процессов,
+    все приводятся к схеме CREDIT_CARD_SCHEMA; при расхождении схем возвращается None.
+    """
+    sources = _expand_sources(sources)
+    if not sources:
+        print("Источники данных не найдены")
+        return None
+    readers = {**SOURCE_READERS, **(readers or {})}
+
+    try:
+        if processes == 1 or len(sources) == 1:
+            frames = [_read_source(source, columns, readers) for source in sources]
+        else:
+            workers = min(processes or os.cpu_count() or 1, len(sources))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                frames = list(pool.map(_read_source, sources,
+                                       [columns] * len(sources), [readers] * len(sources)))
+    except FileNotFoundError as e:
+        print(f"Файл {e.filename} не найден")
+        return None
+    except Exception as e:
+        print(f"Ошибка загрузки: {e}")
+        return None
+
+    # Проверяем, что у всех источников одна схема
+    expected = frames[0].dtypes
+    for source, frame in zip(sources, frames):
+        if not frame.dtypes.equals(expected):
+            print(f"Схема источника {source} отличается от {sources[0]}")
+            return None
+
+    # Категории у всех кадров одинаковые, поэтому concat не переводит их в object
+    df = pd.concat(frames, ignore_index=True)
+    print(f"Данные загружены из {len(sources)} источников. Размер: {df.shape}")
+    return df
@@ -1,66 +1,724 @@
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
+from instrumentation import instrument
+
+# Параметры подготовки данных для регрессии Credit_Limit
+TARGET_COLUMN = 'Credit_Limit'
+COLUMNS_TO_DROP = [
+    'CLIENTNUM',
+    'Attrition_Flag',
+    'Avg_Open_To_Buy'  # Удаляем из-за кореляции с Credit_Limit
+]
+OUTLIER_COLUMNS = ['Credit_Limit', 'Avg_Utilization_Ratio', 'Total_Revolving_Bal', 'Total_Trans_Amt', 'Total_Trans_Ct']
+CATEGORICAL_COLUMNS = ['Gender', 'Education_Level', 'Marital_Status', 'Income_Category', 'Card_Category']
 
-def explore_data(df: pd.DataFrame):
-    """Исследование данных."""
+def explore_data(df: pd.DataFrame, profile: bool = False):
+    """Исследование данных.
+
+    profile=True дополнительно строит DataProfile за один проход, печатает отчет
+    о пропусках и статистики колонок и возвращает профиль (для fill_missing).
+    """
     print("Информация о данных:")
     print(f"Размер: {df.shape}")
     print(f"Колонки: {list(df.columns)}")
-    
-    print("\nПропущенные значения:")
-    print(df.isnull().sum())
-
-def remove_outliers(df, columns, factor=1.5):
-    for col in columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - factor * IQR
-        upper_bound = Q3 + factor * IQR
-        df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
-    return df    
-
-def prepare_data(df: pd.DataFrame) -> tuple:
-    """Подготовка данных для линейной регрессии."""
+
+    if not profile:
+        print("\nПропущенные значения:")
+        print(df.isnull().sum())
+        return None
+
+    data_profile = DataProfile().update(df)
+    print_missing_report(data_profile)
+    print("\nСтатистики колонок:")
+    print(data_profile.summary().to_string())
+    return data_profile
+
+class QuantileSketch:
+    """Сливаемый скетч квантилей KLL (Karnin, Lang, Liberty, 2016).
+
+    Хранит O(k) значений с весами 2^h на уровнях h. Ошибка ранга убывает как O(1/k):
+    при k=200 отклонение ранга оценки от точного не превышает ~1.7% от числа значений
+    с вероятностью 99%, на практике обычно в разы меньше. Скетчи с разных чанков или
+    процессов объединяются через merge без потери гарантий.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 42):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        """Уплотнение переполненных уровней снизу вверх, каждый уровень - одной векторной операцией.
+
+        Уровень целиком сортируется и половина значений (со случайным сдвигом) переходит
+        на уровень выше, даже если в нем тысячи значений: один крупный шаг вместо многих
+        мелких, и ошибка ранга от этого только меньше.
+        """
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # При нечетном количестве одно значение остается на текущем уровне
+            keep = items[:1] if len(items) % 2 else items[:0]
+            items = items[len(keep):]
+            offset = self._rng.integers(2)
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+            self.levels[level] = keep
+            level += 1
+
+    def update(self, values):
+        """Добавление значений (пропуски игнорируются); весь чанк попадает на уровень 0 сразу."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'QuantileSketch'):
+        """Слияние с другим скетчем (результат в self)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля q (0 <= q <= 1) с линейной интерполяцией, как у pandas."""
+        if self.count == 0:
+            return np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2.0 ** level)
+                                  for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, weights = items[order], weights[order]
+        # Ранг значения - середина его веса; переводим в шкалу позиций 0..n-1
+        positions = np.cumsum(weights) - weights / 2 - 0.5
+        return float(np.interp(q * (self.count - 1), positions, items))
+
+def _iqr_bounds(q1: float, q3: float, factor: float) -> tuple:
+    """Границы выбросов по межквартильному размаху."""
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+def iqr_bounds_streaming(chunks, columns, factor=1.5, k: int = 200) -> dict:
+    """Границы выбросов для всех колонок за один проход по чанкам (через QuantileSketch)."""
+    sketches = {col: QuantileSketch(k) for col in columns}
+    for chunk in chunks:
+        for col in columns:
+            sketches[col].update(chunk[col].to_numpy())
+    return {col: _iqr_bounds(sketch.quantile(0.25), sketch.quantile(0.75), factor)
+            for col, sketch in sketches.items()}
+
+def outlier_mask(df: pd.DataFrame, bounds: dict) -> pd.Series:
+    """Общая булева маска строк, попадающих в границы по всем колонкам."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, (lower_bound, upper_bound) in bounds.items():
+        values = df[col].to_numpy()
+        mask &= (values >= lower_bound) & (values <= upper_bound)
+    return mask
+
+def filter_outliers_chunks(chunks, bounds: dict):
+    """Генератор чанков без выбросов по заранее вычисленным границам."""
+    for chunk in chunks:
+        yield chunk[outlier_mask(chunk, bounds)]
+
+@instrument()
+def remove_outliers(df, columns, factor=1.5, method='sequential', chunksize: int = 100_000):
+    """Удаление выбросов по правилу IQR.
+
+    method='sequential' - исходное поведение: колонки фильтруются по очереди, квартили
+    каждой колонки считаются по уже отфильтрованным строкам.
+    method='exact' - точные квартили всех колонок по исходным строкам и одна общая маска.
+    method='sketch' - то же, но квартили оцениваются QuantileSketch за один проход по чанкам.
+    """
+    if method == 'sequential':
+        for col in columns:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            lower_bound = Q1 - factor * IQR
+            upper_bound = Q3 + factor * IQR
+            df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
+        return df
+
+    if method == 'exact':
+        quartiles = df[columns].quantile([0.25, 0.75])
+        bounds = {col: _iqr_bounds(quartiles.at[0.25, col], quartiles.at[0.75, col], factor)
+                  for col in columns}
+    elif method == 'sketch':
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+        bounds = iqr_bounds_streaming(chunks, columns, factor)
+    else:
+        raise ValueError(f"Неизвестный метод удаления выбросов: {method}")
+    return df[outlier_mask(df, bounds)]
+
+@instrument()
+def prepare_data(df: pd.DataFrame, lazy: bool = False) -> tuple:
+    """Подготовка данных для линейной регрессии.
+
+    lazy=True выполняет ту же подготовку через PreprocessingPlan - без копии всего
+    DataFrame и промежуточных кадров; результат X, y совпадает.
+    """
     if df is None:
         return None, None
+
+    if lazy:
+        if TARGET_COLUMN not in df.columns:
+            print(f"Целевая переменная {TARGET_COLUMN} не найдена")
+            return None, None
+        X, y = credit_limit_plan().execute(df)
+        print(f"Признаки: {X.shape}, Целевая: {y.shape}")
+        return X, y
     
     df_processed = df.copy()
     # Удаляем ненужные колонки из копии, чтобы выводить их при визуализации датасета
     print('=' * 60)
     print('Удаляем ненужные (не используются при анализе) колонки из копии, чтобы выводить их при визуализации датасета')
     print('Удаляем Avg_Open_To_Buy из-за кореляции с Credit_Limit')
-    cols_to_drop = [
-        'CLIENTNUM', 
-        'Attrition_Flag', 
-        'Avg_Open_To_Buy'  # Добавляем удаление этого столбца из-за кореляции с Credit_Limit
-    ]
     
-    for col in cols_to_drop:
+    for col in COLUMNS_TO_DROP:
         if col in df_processed.columns:
             df_processed.drop(col, axis=1, inplace=True)
             print(f"Удален столбец: {col}")
     
     # Удаляем выбросы
     print("=" * 60)
-    print('Удаляем выбросы по Credit_Limit, Avg_Utilization_Ratio, Total_Revolving_Bal, Total_Trans_Amt, Total_Trans_Ct')
-    df_processed = remove_outliers(df_processed, ['Credit_Limit', 'Avg_Utilization_Ratio', 'Total_Revolving_Bal', 'Total_Trans_Amt', 'Total_Trans_Ct'])
+    print(f"Удаляем выбросы по {', '.join(OUTLIER_COLUMNS)}")
+    df_processed = remove_outliers(df_processed, OUTLIER_COLUMNS)
     
     # Кодируем категориальные переменные
-    categorical_cols = ['Gender', 'Education_Level', 'Marital_Status', 'Income_Category', 'Card_Category']
-    
-    for col in categorical_cols:
+    for col in CATEGORICAL_COLUMNS:
         if col in df_processed.columns:
             df_processed[col] = df_processed[col].astype('category').cat.codes
     
     # Убедимся, что целевая переменная существует
-    if 'Credit_Limit' not in df_processed.columns:
-        print("Целевая переменная Credit_Limit не найдена")
+    if TARGET_COLUMN not in df_processed.columns:
+        print(f"Целевая переменная {TARGET_COLUMN} не найдена")
         return None, None
     
     # Разделяем на признаки и целевую переменную
-    X = df_processed.drop('Credit_Limit', axis=1)
-    y = df_processed['Credit_Limit']
+    X = df_processed.drop(TARGET_COLUMN, axis=1)
+    y = df_processed[TARGET_COLUMN]
       
     print(f"Признаки: {X.shape}, Целевая: {y.shape}")
-    return X, y
\ No newline at end of file
+    return X, y
+
+class PreprocessingPlan:
+    """Ленивый план подготовки данных: удаление колонок, фильтр выбросов, кодирование, целевая.
+
+    Шаги только записываются; при выполнении план оптимизируется: фильтры всех колонок
+    сливаются в одну булеву маску, а признаки материализуются один раз уже после фильтрации.
+    Удаляемые колонки можно не читать вовсе: required_columns - список для параметра
+    columns загрузчика (так читает файл iter_prepared_chunks).
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def drop(self, columns: list) -> 'PreprocessingPlan':
+        self.steps.append(('drop', list(columns)))
+        return self
+
+    def filter_outliers(self, columns: list, factor: float = 1.5) -> 'PreprocessingPlan':
+        self.steps.append(('filter', (list(columns), factor)))
+        return self
+
+    def encode(self, columns: list) -> 'PreprocessingPlan':
+        self.steps.append(('encode', list(columns)))
+        return self
+
+    def target(self, column: str) -> 'PreprocessingPlan':
+        self.steps.append(('target', column))
+        return self
+
+    def optimize(self, columns: list) -> dict:
+        """Сведение шагов в один набор операций для заданного списка колонок.
+
+        Отсутствующие колонки пропускаются, как и в prepare_data.
+        """
+        dropped, filters, encoded, target = set(), [], [], None
+        for kind, arg in self.steps:
+            if kind == 'drop':
+                dropped.update(arg)
+            elif kind == 'filter':
+                cols, factor = arg
+                filters.extend((col, factor) for col in cols if col in columns)
+            elif kind == 'encode':
+                encoded.extend(col for col in arg if col in columns and col not in dropped)
+            else:
+                target = arg
+        kept = [col for col in columns if col not in dropped]
+        return {
+            'columns': kept,
+            'filters': filters,
+            'encode': encoded,
+            'target': target,
+            'features': [col for col in kept if col != target],
+        }
+
+    def required_columns(self, columns) -> list:
+        """Колонки из columns, которые нужно прочитать из источника (для параметра columns загрузчика)."""
+        return self.optimize(list(columns))['columns']
+
+    def execute(self, df: pd.DataFrame) -> tuple:
+        """Выполнение плана над DataFrame в памяти.
+
+        Фильтры применяются с той же последовательной семантикой, что remove_outliers:
+        квартили каждой колонки считаются по строкам, прошедшим предыдущие фильтры,
+        но копируется только одна колонка, а не весь кадр.
+        """
+        plan = self.optimize(list(df.columns))
+
+        mask = np.ones(len(df), dtype=bool)
+        for col, factor in plan['filters']:
+            values = df[col].to_numpy()
+            current = pd.Series(values[mask])
+            lower_bound, upper_bound = _iqr_bounds(current.quantile(0.25), current.quantile(0.75), factor)
+            mask &= (values >= lower_bound) & (values <= upper_bound)
+
+        return self._materialize(df, mask, plan)
+
+    def _materialize(self, df: pd.DataFrame, mask, plan: dict, dtypes: dict = None) -> tuple:
+        """Сборка X, y: каждая колонка копируется один раз, уже после фильтрации.
+
+        Использованные при кодировании категории сохраняются в self.categories_
+        (код - позиция значения в списке).
+        """
+        data = {}
+        self.categories_ = {}
+        for col in plan['features']:
+            values = df[col].array[mask]
+            if col in plan['encode']:
+                dtype = 'category' if dtypes is None else dtypes[col]
+                encoded = pd.Series(values).astype(dtype)
+                self.categories_[col] = encoded.cat.categories.tolist()
+                values = encoded.cat.codes.to_numpy()
+            data[col] = values
+        X = pd.DataFrame(data, index=df.index[mask], copy=False)
+        y = df[plan['target']][mask] if plan['target'] is not None else None
+        return X, y
+
+    def execute_chunks(self, chunk_factory):
+        """Потоковое выполнение плана: генератор пар X, y по чанкам, в сумме равных execute.
+
+        chunk_factory - функция без аргументов, возвращающая новый итератор чанков
+        (например, lambda: iter_credit_card_data(path)). Проходов по источнику несколько:
+        первый чанк - чтобы узнать колонки и типы; затем по полному проходу на каждую
+        колонку фильтра, потому что квартили колонки считаются по строкам, прошедшим
+        предыдущие фильтры (последовательная семантика remove_outliers), - в памяти
+        держатся только эти значения одной колонки; еще один проход собирает значения
+        некатегориальных колонок кодирования (у типизированного загрузчика их нет);
+        последний фильтрует и кодирует. Для credit_limit_plan и iter_credit_card_data
+        это 6 полных чтений (5 фильтров и итоговое), поэтому источник стоит читать
+        только с нужными колонками (required_columns).
+        """
+        plan = None
+        for chunk in chunk_factory():
+            plan = self.optimize(list(chunk.columns))
+            dtypes = {col: chunk[col].dtype for col in plan['encode']}
+            break
+        if plan is None:
+            return
+
+        def mask(chunk: pd.DataFrame, bounds: list):
+            result = np.ones(len(chunk), dtype=bool)
+            for col, (lower_bound, upper_bound) in bounds:
+                values = chunk[col].to_numpy()
+                result &= (values >= lower_bound) & (values <= upper_bound)
+            return result
+
+        bounds = []
+        for col, factor in plan['filters']:
+            current = pd.Series(np.concatenate([chunk[col].to_numpy()[mask(chunk, bounds)]
+                                                for chunk in chunk_factory()]))
+            bounds.append((col, _iqr_bounds(current.quantile(0.25), current.quantile(0.75), factor)))
+
+        # Категории как у astype('category') по оставшимся строкам: у категориальных
+        # колонок - категории их типа (одинакового во всех чанках типизированного
+        # загрузчика), у остальных - отсортированные встреченные значения
+        collect = [col for col, dtype in dtypes.items() if not isinstance(dtype, pd.CategoricalDtype)]
+        if collect:
+            categories = {col: set() for col in collect}
+            for chunk in chunk_factory():
+                rows = mask(chunk, bounds)
+                for col in collect:
+                    categories[col].update(chunk[col][rows].dropna().unique())
+            dtypes.update({col: pd.CategoricalDtype(sorted(values)) for col, values in categories.items()})
+
+        for chunk in chunk_factory():
+            yield self._materialize(chunk, mask(chunk, bounds), plan, dtypes)
+
+def category_mappings(df: pd.DataFrame) -> dict:
+    """Категории, по которым prepare_data кодирует колонки df: {колонка: [значение для кода 0, 1, ...]}."""
+    plan = credit_limit_plan()
+    plan.execute(df)
+    return plan.categories_
+
+def credit_limit_plan() -> PreprocessingPlan:
+    """План, повторяющий prepare_data."""
+    return (PreprocessingPlan()
+            .drop(COLUMNS_TO_DROP)
+            .filter_outliers(OUTLIER_COLUMNS)
+            .encode(CATEGORICAL_COLUMNS)
+            .target(TARGET_COLUMN))
+
+def iter_prepared_chunks(file_path: str, chunksize: int = 100_000, plan: PreprocessingPlan = None):
+    """Потоковая подготовка файла планом (по умолчанию credit_limit_plan): генератор пар X, y.
+
+    Загрузчик читает только колонки plan.required_columns, удаляемые планом колонки
+    не разбираются ни на одном из проходов execute_chunks.
+    """
+    import data_loader
+
+    plan = plan or credit_limit_plan()
+    columns = plan.required_columns(data_loader.CREDIT_CARD_SCHEMA)
+    return plan.execute_chunks(lambda: data_loader.iter_credit_card_data(file_path, chunksize, columns))
+
+class HyperLogLog:
+    """Оценка числа уникальных значений HyperLogLog (Flajolet и др., 2007).
+
+    2^p регистров по одному байту; относительная ошибка ~1.04 / sqrt(2^p)
+    (при p=14 - около 0.8%). Скетчи объединяются поэлементным максимумом регистров.
+    """
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        """Добавление значений (хэшируются векторно через pandas).
+
+        Числа и даты хэшируются по своему двоичному представлению, без перевода в object.
+        """
+        if len(values) == 0:
+            return
+        values = np.asarray(values)
+        if values.dtype.kind not in 'biufcmM':
+            values = values.astype(object)
+        hashes = pd.util.hash_array(values)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Позиция первой единицы в оставшихся 64-p битах (frexp дает длину числа в битах)
+        bit_length = np.frexp(rest.astype(float))[1]
+        rank = (64 - self.p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Поправка для малых значений - линейный подсчет
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+class DataProfile:
+    """Профиль DataFrame: пропуски, min/max/среднее/дисперсия, квантили, уникальные, top-k.
+
+    Все статистики считаются за один векторный проход по каждому чанку (update) и
+    сливаются между чанками или процессами (merge). Пока уникальных значений колонки
+    не больше exact_limit, они считаются точно, иначе число уникальных оценивает
+    HyperLogLog, а top-k становится приближенным (хранятся top_limit частых значений).
+    """
+
+    def __init__(self, exact_limit: int = 10_000, top_limit: int = 100, k: int = 200):
+        self.exact_limit = exact_limit
+        self.top_limit = top_limit
+        self.k = k
+        self.columns = {}
+
+    def _new_column(self, numeric: bool) -> dict:
+        column = {
+            'count': 0, 'nulls': 0, 'numeric': numeric,
+            'counts': pd.Series(dtype='int64'), 'exact': True, 'hll': HyperLogLog(),
+        }
+        if numeric:
+            column.update({'min': np.inf, 'max': -np.inf, 'mean': 0.0, 'm2': 0.0,
+                           'sketch': QuantileSketch(self.k)})
+        return column
+
+    def _merge_counts(self, column: dict, counts: pd.Series):
+        """Сложение частот (Series значение -> количество) выравниванием индексов, без цикла по значениям."""
+        merged = counts if column['counts'].empty else column['counts'].add(counts, fill_value=0)
+        merged = merged.astype('int64')
+        if len(merged) > self.exact_limit:
+            column['exact'] = False
+        if not column['exact'] and len(merged) > self.top_limit:
+            merged = merged.nlargest(self.top_limit)
+        column['counts'] = merged
+
+    @staticmethod
+    def _merge_moments(column: dict, count: int, mean: float, m2: float):
+        """Объединение среднего и суммы квадратов отклонений (формулы Чана/Уэлфорда)."""
+        total = column['count'] + count
+        delta = mean - column['mean']
+        column['mean'] += delta * count / total
+        column['m2'] += m2 + delta * delta * column['count'] * count / total
+
+    def update(self, df: pd.DataFrame) -> 'DataProfile':
+        """Учет очередного чанка."""
+        for name in df.columns:
+            series = df[name]
+            numeric = pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+            if name not in self.columns:
+                self.columns[name] = self._new_column(numeric)
+            column = self.columns[name]
+
+            # value_counts сам пропускает NaN: пропуски - разница с длиной чанка,
+            # без отдельного isna и копии непустых значений
+            counts = series.value_counts(sort=False)
+            non_null = int(counts.sum())
+            # У категориальной колонки value_counts возвращает и не встреченные категории (с нулем)
+            counts = counts[counts > 0]
+            column['nulls'] += len(series) - non_null
+            column['hll'].update(counts.index.to_numpy())
+            self._merge_counts(column, counts.rename_axis(None).rename(None))
+
+            if numeric and non_null:
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                mean = values.mean()
+                self._merge_moments(column, len(values), mean, float(((values - mean) ** 2).sum()))
+                column['min'] = min(column['min'], values.min())
+                column['max'] = max(column['max'], values.max())
+                column['sketch'].update(values)
+            column['count'] += non_null
+        return self
+
+    def merge(self, other: 'DataProfile') -> 'DataProfile':
+        """Слияние с профилем другого чанка или процесса."""
+        for name, theirs in other.columns.items():
+            if name not in self.columns:
+                self.columns[name] = theirs
+                continue
+            ours = self.columns[name]
+            ours['nulls'] += theirs['nulls']
+            ours['hll'].merge(theirs['hll'])
+            ours['exact'] = ours['exact'] and theirs['exact']
+            self._merge_counts(ours, theirs['counts'])
+            if ours['numeric'] and theirs['count']:
+                self._merge_moments(ours, theirs['count'], theirs['mean'], theirs['m2'])
+                ours['min'] = min(ours['min'], theirs['min'])
+                ours['max'] = max(ours['max'], theirs['max'])
+                ours['sketch'].merge(theirs['sketch'])
+            ours['count'] += theirs['count']
+        return self
+
+    def missing(self) -> pd.Series:
+        """Количество пропусков по колонкам."""
+        return pd.Series({name: column['nulls'] for name, column in self.columns.items()}, dtype='int64')
+
+    def cardinality(self, name: str) -> float:
+        column = self.columns[name]
+        return len(column['counts']) if column['exact'] else column['hll'].estimate()
+
+    def top_values(self, name: str, n: int = 5) -> list:
+        """n самых частых значений колонки: [(значение, количество), ...]."""
+        counts = self.columns[name]['counts']
+        return list(counts.nlargest(n).items())
+
+    def mean(self, name: str) -> float:
+        column = self.columns[name]
+        return column['mean'] if column['count'] else np.nan
+
+    def variance(self, name: str) -> float:
+        """Выборочная дисперсия (ddof=1, как у pandas)."""
+        column = self.columns[name]
+        return column['m2'] / (column['count'] - 1) if column['count'] > 1 else np.nan
+
+    def quantile(self, name: str, q: float) -> float:
+        return self.columns[name]['sketch'].quantile(q)
+
+    def mode(self, name: str):
+        top = self.top_values(name, 1)
+        return top[0][0] if top else np.nan
+
+    def summary(self) -> pd.DataFrame:
+        """Сводная таблица статистик по колонкам."""
+        rows = {}
+        for name, column in self.columns.items():
+            total = column['count'] + column['nulls']
+            row = {
+                'count': column['count'],
+                'nulls': column['nulls'],
+                'null_pct': 100.0 * column['nulls'] / total if total else 0.0,
+                'unique': round(self.cardinality(name)),
+                'top': self.mode(name),
+            }
+            if column['numeric'] and column['count']:
+                row.update({
+                    'min': column['min'], 'max': column['max'],
+                    'mean': self.mean(name), 'std': np.sqrt(self.variance(name)),
+                    'q25': self.quantile(name, 0.25), 'median': self.quantile(name, 0.5),
+                    'q75': self.quantile(name, 0.75),
+                })
+            rows[name] = row
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+def profile_chunks(chunks, **kwargs) -> DataProfile:
+    """Профиль потока чанков (например, iter_credit_card_data)."""
+    data_profile = DataProfile(**kwargs)
+    for chunk in chunks:
+        data_profile.update(chunk)
+    return data_profile
+
+def count_missing(df: pd.DataFrame) -> pd.Series:
+    """Количество пропущенных значений в каждой колонке."""
+    return df.isnull().sum()
+
+def print_missing_report(data_profile) -> pd.DataFrame:
+    """Отчет о пропущенных значениях по DataProfile (или DataFrame)."""
+    if isinstance(data_profile, pd.DataFrame):
+        data_profile = DataProfile().update(data_profile)
+    summary = data_profile.summary()[['count', 'nulls', 'null_pct']]
+    print("\nПропущенные значения:")
+    print("=" * 60)
+    for name, row in summary.iterrows():
+        print(f"{name[:40]:40s}: {int(row['nulls']):8d} ({row['null_pct']:5.1f}%)")
+    print(f"Всего пропусков: {int(summary['nulls'].sum())}")
+    print("=" * 60)
+    return summary
+
+def fill_missing(df: pd.DataFrame, data_profile: DataProfile, strategy='median', columns: list = None) -> pd.DataFrame:
+    """Заполнение пропусков по заранее посчитанному профилю - без повторного прохода по данным.
+
+    strategy - 'mean', 'median', 'mode' или словарь {колонка: стратегия}. Для нечисловых
+    колонок всегда используется 'mode'. Заполняются только колонки, где профиль нашел пропуски.
+    """
+    if columns is None:
+        columns = [name for name, column in data_profile.columns.items() if column['nulls'] and name in df.columns]
+
+    values = {}
+    for name in columns:
+        column_strategy = strategy.get(name, 'median') if isinstance(strategy, dict) else strategy
+        if not data_profile.columns[name]['numeric']:
+            column_strategy = 'mode'
+        if column_strategy == 'mean':
+            values[name] = data_profile.mean(name)
+        elif column_strategy == 'median':
+            values[name] = data_profile.quantile(name, 0.5)
+        elif column_strategy == 'mode':
+            values[name] = data_profile.mode(name)
+        else:
+            raise ValueError(f"Неизвестная стратегия заполнения: {column_strategy}")
+        print(f"Заполняем пропуски в {name} ({column_strategy}): {values[name]}")
+
+    return df.fillna(values) if values else df
+
+class TargetCorrelation:
+    """Корреляция Пирсона каждого признака с целевой колонкой за O(p·n).
+
+    По чанкам копятся суммы x, y, x², y², x·y и число пар без пропусков для каждого
+    признака (как pairwise-complete в DataFrame.corr). Значения сдвигаются на средние
+    первого чанка, чтобы суммы квадратов не теряли точность.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self.columns = None
+        self._shift = None
+        self._sums = None
+
+    def update(self, df: pd.DataFrame) -> 'TargetCorrelation':
+        if self.columns is None:
+            numeric = df.select_dtypes(include=['number']).columns
+            self.columns = [col for col in numeric if col != self.target]
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        y = df[self.target].to_numpy(dtype=np.float64)
+        if self._shift is None:
+            with np.errstate(all='ignore'):
+                self._shift = (np.nan_to_num(np.nanmean(X, axis=0)), np.nan_to_num(np.nanmean(y)))
+            self._sums = np.zeros((6, len(self.columns)))
+        X = X - self._shift[0]
+        y = (y - self._shift[1])[:, None]
+
+        valid = ~np.isnan(X) & ~np.isnan(y)
+        X = np.where(valid, X, 0.0)
+        Y = np.where(valid, y, 0.0)
+        self._sums += np.stack([valid.sum(axis=0), X.sum(axis=0), Y.sum(axis=0),
+                                (X * X).sum(axis=0), (Y * Y).sum(axis=0), (X * Y).sum(axis=0)])
+        return self
+
+    def merge(self, other: 'TargetCorrelation') -> 'TargetCorrelation':
+        """Слияние (аккумуляторы должны получать данные с одним сдвигом - от одного первого чанка)."""
+        if self._sums is None:
+            self.columns, self._shift, self._sums = other.columns, other._shift, other._sums.copy()
+        elif other._sums is not None:
+            self._sums += other._sums
+        return self
+
+    def result(self) -> pd.Series:
+        n, sx, sy, sxx, syy, sxy = self._sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[(n < 2) | (var_x <= 0) | (var_y <= 0)] = np.nan
+        return pd.Series(np.clip(corr, -1, 1), index=self.columns, name=self.target)
+
+# Кэш результатов correlation_with_target: (отпечаток данных, целевая) -> Series
+_correlation_cache = OrderedDict()
+CORRELATION_CACHE_SIZE = 16
+
+def data_fingerprint(df: pd.DataFrame, sample_rows: int = 4096) -> tuple:
+    """Отпечаток содержимого DataFrame: форма, колонки, типы, суммы числовых колонок
+    и хэш не более sample_rows равномерно взятых строк.
+
+    Хэш всех значений стоил почти половину самого расчета корреляции; суммы колонок -
+    один векторный проход, а вместе с выборкой строк они меняются при любой
+    правдоподобной правке данных.
+    """
+    step = max(len(df) // sample_rows, 1)
+    sample_hash = int(pd.util.hash_pandas_object(df.iloc[::step], index=False).sum())
+    sums = tuple(df.select_dtypes('number').sum().tolist())
+    return df.shape, tuple(df.columns), tuple(map(str, df.dtypes)), sums, sample_hash
+
+def correlation_with_target(df: pd.DataFrame, target: str = TARGET_COLUMN, chunksize: int = 100_000) -> pd.Series:
+    """Корреляция всех числовых признаков с target (равна df.corr()[target].drop(target)).
+
+    Результат кэшируется по отпечатку данных; возвращается копия, чтобы изменения
+    у вызывающего не портили кэш.
+    """
+    key = (data_fingerprint(df), target)
+    if key in _correlation_cache:
+        _correlation_cache.move_to_end(key)
+        return _correlation_cache[key].copy()
+
+    engine = TargetCorrelation(target)
+    for start in range(0, max(len(df), 1), chunksize):
+        engine.update(df.iloc[start:start + chunksize])
+    correlations = engine.result()
+
+    _correlation_cache[key] = correlations
+    if len(_correlation_cache) > CORRELATION_CACHE_SIZE:
+        _correlation_cache.popitem(last=False)
+    return correlations.copy()
+
+def correlation_with_target_chunks(chunks, target: str = TARGET_COLUMN) -> pd.Series:
+    """Корреляция с target по потоку чанков (например, iter_credit_card_data)."""
+    engine = TargetCorrelation(target)
+    for chunk in chunks:
+        engine.update(chunk)
+    return engine.result()
@@ -0,0 +1,125 @@
+"""Замеры этапов конвейера: время, процессорное время, пиковая память, строки на входе и выходе.
+
+Включается переменной окружения PIPELINE_PROFILE (путь к отчету .json или .csv) или
+функцией enable. PIPELINE_CPROFILE_DIR (или enable(cprofile_dir=...)) дополнительно
+сохраняет cProfile каждого вызова. В выключенном состоянии обертка только проверяет флаг.
+"""
+import cProfile
+import csv
+import functools
+import json
+import os
+import time
+import tracemalloc
+
+_state = {
+    'enabled': bool(os.environ.get('PIPELINE_PROFILE')),
+    'report_path': os.environ.get('PIPELINE_PROFILE') or None,
+    'cprofile_dir': os.environ.get('PIPELINE_CPROFILE_DIR') or None,
+}
+records = []
+# Пики памяти вложенных этапов: tracemalloc.reset_peak внутреннего этапа сбрасывает пик внешнего
+_peak_stack = []
+
+def enable(report_path: str = None, cprofile_dir: str = None):
+    """Включение замеров; не заданные аргументы сохраняют текущие значения (например, из окружения)."""
+    _state['enabled'] = True
+    if report_path is not None:
+        _state['report_path'] = report_path
+    if cprofile_dir is not None:
+        _state['cprofile_dir'] = cprofile_dir
+
+def disable():
+    _state['enabled'] = False
+
+def is_enabled() -> bool:
+    return _state['enabled']
+
+def _rows(value):
+    """Число строк DataFrame/массива (для кортежа - первого элемента)."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+def instrument(stage: str = None):
+    """Декоратор замера этапа."""
+    def decorator(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return func(*args, **kwargs)
+            return _measure(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+def _measure(name: str, func, args, kwargs):
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    if _peak_stack:
+        # Сохраняем пик внешнего этапа перед сбросом
+        _peak_stack[-1] = max(_peak_stack[-1], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    _peak_stack.append(0)
+
+    # cProfile не допускает вложенных профилировщиков - профилируем только внешний этап
+    profiler = cProfile.Profile() if _state['cprofile_dir'] and len(_peak_stack) == 1 else None
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        if profiler:
+            result = profiler.runcall(func, *args, **kwargs)
+        else:
+            result = func(*args, **kwargs)
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        peak = max(_peak_stack.pop(), tracemalloc.get_traced_memory()[1])
+        if _peak_stack:
+            _peak_stack[-1] = max(_peak_stack[-1], peak)
+        if started_tracing:
+            tracemalloc.stop()
+
+    record = {
+        'stage': name,
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'peak_mem_mb': (peak - base) / 2 ** 20,
+        'rows_in': next((rows for rows in map(_rows, args) if rows is not None), None),
+        'rows_out': _rows(result),
+    }
+    if profiler:
+        os.makedirs(_state['cprofile_dir'], exist_ok=True)
+        path = os.path.join(_state['cprofile_dir'], f"{name}-{len(records)}.prof")
+        profiler.dump_stats(path)
+        record['cprofile'] = path
+    records.append(record)
+    return result
+
+def write_report(path: str = None) -> str:
+    """Сохранение замеров в JSON или CSV (по расширению файла)."""
+    path = path or _state['report_path'] or 'pipeline_profile.json'
+    if path.endswith('.csv'):
+        fields = ['stage', 'wall_s', 'cpu_s', 'peak_mem_mb', 'rows_in', 'rows_out', 'cprofile']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=1)
+    print(f"Отчет о замерах сохранен: {path}")
+    return path
+
+def print_report():
+    print("=== Замеры этапов ===")
+    for record in records:
+        rows = f"{record['rows_in']} -> {record['rows_out']}"
+        print(f"{record['stage']:25s}: {record['wall_s'] * 1000:9.1f} мс, CPU {record['cpu_s'] * 1000:9.1f} мс, "
+              f"память {record['peak_mem_mb']:8.1f} МБ, строки {rows}")
+    print("=" * 60)
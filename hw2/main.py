@@ -1,80 +1,187 @@
+import os
+import sys
 import data_loader
 import data_processing
 import ml_module
-import visualization
+import instrumentation
+from pipeline import Pipeline, file_fingerprint
 import pandas as pd
-import numpy as np
 
-def main():
-    print("ПРОГНОЗИРОВАНИЕ КРЕДИТНОГО ЛИМИТА")
-    print("=" * 60)
-    
-    # Загрузка данных
-    df = data_loader.load_credit_card_data('D:/GIT/ds/hw2/BankChurners.csv')
-    
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+PLOT_STAGES = ['correlation_plot', 'target_plot', 'prediction_plot']
+
+# Этапы конвейера. Результат каждого этапа с данными кэшируется на диске (pipeline.Pipeline)
+# по хэшу кода этапа, его параметров и входов, поэтому при повторном запуске пересчитываются
+# только этапы, затронутые изменениями, а этапы печати и графиков выполняются всегда.
+# visualization (matplotlib) импортируется только этапами графиков, поэтому обучение
+# без графиков не загружает matplotlib.
+
+def load_data(path: str, source: dict, use_cache: bool = True) -> pd.DataFrame:
+    """Загрузка данных (source - отпечаток файла, нужен только для ключа кэша)."""
+    df = data_loader.load_credit_card_data_cached(path, use_cache=use_cache)
+
     # Удаляем колонки, которые в описании датасета рекрмендуют удалить до исследования (не будем их визуализировать даже для анализа)
     print('Удаляем колонки, которые в описании датасета рекрмендуют удалить до исследования (не будем их визуализировать даже для анализа)')
-    cols_to_drop = [
-        'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_1',
-        'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_2',
-    ]
-    for col in cols_to_drop:
+    for col in data_loader.NAIVE_BAYES_COLUMNS:
         if col in df.columns:
             df.drop(col, axis=1, inplace=True)
             print(f"Удален столбец: {col}")
-    
-    if df is None:
-        print("Скачайте датасет: https://www.kaggle.com/datasets/sakshigoyal7/credit-card-customers")
-        return
-    
+    return df
+
+def explore(df: pd.DataFrame):
     # Исследование данных
     data_processing.explore_data(df)
-    
+
+def plot_correlation(df: pd.DataFrame):
+    import visualization
     # Анализ корреляции перед обработкой
     print("\nАНАЛИЗ КОРРЕЛЯЦИИ С CREDIT_LIMIT:")
     print("=" * 60)
-    
+
     # Построим график корреляции с целевой переменной
     visualization.plot_correlation_with_target(df, 'Credit_Limit')
-      
+
+def prepare(df: pd.DataFrame) -> tuple:
     # Подготовка данных
-    X, y = data_processing.prepare_data(df)
-    if X is None or y is None:
-        return
-    
+    return data_processing.prepare_data(df)
+
+def plot_target(prepared: tuple):
+    import visualization
     # Визуализация целевой переменной
+    X, y = prepared
     print('='*60)
     print('Визуализация целевой переменной')
     visualization.plot_histogram(y, 'Распределение кредитного лимита', 'Кредитный лимит', 'Частота')
-    
+
+def split(prepared: tuple) -> tuple:
     # Разделение данных
-    X_train, X_test, y_train, y_test = ml_module.split_data(X, y)
-    
+    X, y = prepared
+    return ml_module.split_data(X, y)
+
+def scale(split_result: tuple) -> tuple:
     # Масштабирование признаков
-    X_train_scaled, X_test_scaled, scaler = ml_module.scale_features(X_train, X_test)
-    
+    X_train, X_test, y_train, y_test = split_result
+    return ml_module.scale_features(X_train, X_test)
+
+def train(split_result: tuple, scaled: tuple):
     # Обучение модели
+    X_train_scaled, X_test_scaled, scaler = scaled
+    y_train = split_result[2]
     print()
     print('=' * 60)
     print("Обучение линейной регрессии...")
     model = ml_module.train_linear_regression(X_train_scaled, y_train)
     print('=' * 60)
     print()
+    return model
 
+def evaluate(model, split_result: tuple, scaled: tuple) -> tuple:
     # Предсказание
-    y_pred = ml_module.predict(model, X_test_scaled)
-    
+    y_pred = ml_module.predict(model, scaled[1])
+
     # Оценка модели
-    metrics = ml_module.evaluate_model(y_test, y_pred)
-    
+    metrics = ml_module.evaluate_model(split_result[3], y_pred)
+    return y_pred, metrics
+
+def coefficients(model, prepared: tuple) -> pd.DataFrame:
     # Коэффициенты модели
-    coefficients = ml_module.get_coefficients(model, X.columns.tolist())
-    ml_module.print_coefficients(coefficients)
-    
+    coefficients_df = ml_module.get_coefficients(model, prepared[0].columns.tolist())
+    ml_module.print_coefficients(coefficients_df)
+    return coefficients_df
+
+def export(model, scaled: tuple, prepared: tuple, df: pd.DataFrame, path: str = 'credit_limit_model.json') -> str:
+    # Экспорт модели для скоринга (scoring.py) без sklearn
+    return ml_module.export_model(model, scaled[2], prepared[0].columns.tolist(),
+                                  data_processing.category_mappings(df), path)
+
+def plot_predictions(split_result: tuple, evaluated: tuple):
+    import visualization
     # Визуализация
-    visualization.plot_predictions(y_test, y_pred)
-    
+    visualization.plot_predictions(split_result[3], evaluated[0])
+
+def build_pipeline(path: str = DATA_PATH, use_cache: bool = True, force: bool = False,
+                   plots: bool = True, model_path: str = 'credit_limit_model.json') -> Pipeline:
+    """DAG этапов: load -> explore / correlation -> prepare -> split -> scale -> train -> evaluate.
+
+    Кэшируются только этапы, вычисляющие данные; печать и графики (cache=False)
+    выполняются при каждом запуске, export - если нет файла модели или изменились входы.
+    plots=False - без этапов графиков (и без импорта matplotlib).
+    """
+    if plots:
+        import visualization
+    pipeline = (Pipeline(force=force)
+            .add('load', load_data, code_deps=[data_loader], path=path,
+                 source=file_fingerprint(path), use_cache=use_cache)
+            .add('explore', explore, ['load'], code_deps=[data_processing], cache=False))
+    if plots:
+        pipeline.add('correlation_plot', plot_correlation, ['load'], code_deps=[visualization, data_processing],
+                     cache=False)
+    pipeline.add('prepare', prepare, ['load'], code_deps=[data_processing])
+    if plots:
+        pipeline.add('target_plot', plot_target, ['prepare'], code_deps=[visualization], cache=False)
+    (pipeline
+            .add('split', split, ['prepare'], code_deps=[ml_module.split_data])
+            .add('scale', scale, ['split'], code_deps=[ml_module.scale_features])
+            .add('train', train, ['split', 'scale'], code_deps=[ml_module.train_linear_regression])
+            .add('evaluate', evaluate, ['train', 'split', 'scale'],
+                 code_deps=[ml_module.predict, ml_module.evaluate_model, ml_module.RegressionMetrics,
+                            ml_module._report_metrics], cache=False)
+            .add('coefficients', coefficients, ['train', 'prepare'],
+                 code_deps=[ml_module.get_coefficients, ml_module.print_coefficients], cache=False)
+            .add('export', export, ['train', 'scale', 'prepare', 'load'],
+                 code_deps=[ml_module.export_model, ml_module.fold_scaler, data_processing],
+                 outputs=[model_path], path=model_path))
+    if plots:
+        pipeline.add('prediction_plot', plot_predictions, ['split', 'evaluate'], code_deps=[visualization],
+                     cache=False)
+    return pipeline
+
+def render_plots(pipeline: Pipeline, names: list = PLOT_STAGES):
+    """Этапы графиков: в режиме файлов (PLOT_OUTPUT_DIR) - параллельно, каждый в своем процессе.
+
+    Входы этапов вычисляются или берутся из кэша в текущем процессе, поэтому отчет
+    строится за время самого долгого графика. В интерактивном режиме графики
+    показываются по очереди.
+    """
+    import rendering
+
+    names = [name for name in names if name in pipeline.stages]
+    if not rendering.is_headless():
+        for name in names:
+            pipeline.call(name)
+        return
+    rendering.render_parallel([pipeline.task(name) for name in names])
+
+def main(use_cache: bool = True, explain: bool = False, force: bool = False, path: str = DATA_PATH):
+    print("ПРОГНОЗИРОВАНИЕ КРЕДИТНОГО ЛИМИТА")
+    print("=" * 60)
+
+    if not os.path.exists(path):
+        print(f"Файл {path} не найден")
+        print("Скачайте датасет: https://www.kaggle.com/datasets/sakshigoyal7/credit-card-customers")
+        return
+
+    pipeline = build_pipeline(path, use_cache=use_cache, force=force)
+    import rendering
+    if rendering.is_headless():
+        # Сначала этапы с данными и печатью, затем все графики параллельно
+        pipeline.run([name for name in pipeline.stages if name not in PLOT_STAGES], explain=explain)
+        render_plots(pipeline)
+    else:
+        pipeline.run(explain=explain)
+
+    # Замеры этапов (включаются переменной окружения PIPELINE_PROFILE)
+    if instrumentation.is_enabled():
+        instrumentation.print_report()
+        instrumentation.write_report()
+
     print("Анализ завершен!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --no-cache: загрузить CSV заново, не используя колоночный кэш
+    # --force: пересчитать все этапы; --explain: показать, какие этапы взяты из кэша
+    # --profile: замеры этапов в pipeline_profile.json или в файл из PIPELINE_PROFILE
+    # (учитываются только пересчитанные этапы), cProfile - в PIPELINE_CPROFILE_DIR, если задан
+    if '--profile' in sys.argv:
+        instrumentation.enable()
+    main(use_cache='--no-cache' not in sys.argv, explain='--explain' in sys.argv, force='--force' in sys.argv)
@@ -1,14 +1,21 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+from sklearn.linear_model import LinearRegression, enet_path
+import scoring
+from instrumentation import instrument
 
 def split_data(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, random_state: int = 42):
     """Разделение данных на тренировочную и тестовую выборки."""
     return train_test_split(X, y, test_size=test_size, random_state=random_state)
 
+@instrument()
 def scale_features(X_train: pd.DataFrame, X_test: pd.DataFrame):
     """Масштабирование признаков."""
     scaler = StandardScaler()
@@ -16,31 +23,451 @@ def scale_features(X_train: pd.DataFrame, X_test: pd.DataFrame):
     X_test_scaled = scaler.transform(X_test)
     return X_train_scaled, X_test_scaled, scaler
 
+@instrument()
 def train_linear_regression(X_train: pd.DataFrame, y_train: pd.Series):
     """Обучение модели линейной регрессии."""
     model = LinearRegression()
     model.fit(X_train, y_train)
     return model
 
+class IncrementalLinearRegression:
+    """Линейная регрессия со StandardScaler, обучаемая по частям (out-of-core).
+
+    partial_fit накапливает только достаточные статистики: число строк, средние X и y,
+    центрированные матрицы XᵀX и Xᵀy (слияние по формулам Чана). Память O(p²) не зависит
+    от числа строк. Коэффициенты - в пространстве масштабированных признаков, как у
+    LinearRegression, обученной на выходе scale_features; система решается разложением
+    Холецкого, а при вырожденной матрице - через lstsq (SVD).
+    """
+
+    def __init__(self):
+        self.n_samples_seen_ = 0
+        self.coef_ = None
+        self.intercept_ = None
+
+    def partial_fit(self, X, y):
+        """Учет очередного чанка данных (дописывание новых строк)."""
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = len(X)
+        if n == 0:
+            return self
+        mean_x = X.mean(axis=0)
+        mean_y = y.mean()
+        Xc = X - mean_x
+        yc = y - mean_y
+        cxx = Xc.T @ Xc
+        cxy = Xc.T @ yc
+        cyy = yc @ yc
+
+        if self.n_samples_seen_ == 0:
+            self.mean_x_, self.mean_y_ = mean_x, mean_y
+            self.cxx_, self.cxy_, self.cyy_ = cxx, cxy, cyy
+        else:
+            total = self.n_samples_seen_ + n
+            weight = self.n_samples_seen_ * n / total
+            dx = mean_x - self.mean_x_
+            dy = mean_y - self.mean_y_
+            self.cxx_ = self.cxx_ + cxx + weight * np.outer(dx, dx)
+            self.cxy_ = self.cxy_ + cxy + weight * dx * dy
+            self.cyy_ = self.cyy_ + cyy + weight * dy * dy
+            self.mean_x_ = self.mean_x_ + dx * n / total
+            self.mean_y_ = self.mean_y_ + dy * n / total
+        self.n_samples_seen_ += n
+        self._solve()
+        return self
+
+    def fit(self, X, y, chunksize: int = 100_000):
+        """Обучение с нуля, данные подаются порциями по chunksize строк."""
+        self.n_samples_seen_ = 0
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        for start in range(0, len(X), chunksize):
+            self.partial_fit(X[start:start + chunksize], y[start:start + chunksize])
+        return self
+
+    def _solve(self):
+        """Решение нормальных уравнений для стандартизованных признаков."""
+        var = np.diag(self.cxx_) / self.n_samples_seen_
+        # Как в StandardScaler: для постоянных признаков масштаб 1
+        self.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+        self.var_ = var
+        gram = self.cxx_ / np.outer(self.scale_, self.scale_)
+        rhs = self.cxy_ / self.scale_
+        try:
+            L = np.linalg.cholesky(gram)
+            self.coef_ = np.linalg.solve(L.T, np.linalg.solve(L, rhs))
+        except np.linalg.LinAlgError:
+            self.coef_ = np.linalg.lstsq(gram, rhs, rcond=None)[0]
+        # Масштабированные признаки центрированы, поэтому свободный член - среднее y
+        self.intercept_ = float(self.mean_y_)
+
+    def transform(self, X):
+        """Масштабирование признаков накопленными средними и стандартными отклонениями."""
+        return (np.asarray(X, dtype=float) - self.mean_x_) / self.scale_
+
+    def predict(self, X_scaled):
+        """Предсказание по масштабированным признакам (как LinearRegression.predict)."""
+        return np.asarray(X_scaled, dtype=float) @ self.coef_ + self.intercept_
+
+    def scaler(self) -> StandardScaler:
+        """StandardScaler с накопленными статистиками - замена scaler из scale_features."""
+        scaler = StandardScaler()
+        scaler.mean_ = self.mean_x_.copy()
+        scaler.var_ = self.var_.copy()
+        scaler.scale_ = self.scale_.copy()
+        scaler.n_samples_seen_ = self.n_samples_seen_
+        scaler.n_features_in_ = len(self.mean_x_)
+        if hasattr(self, 'feature_names_in_'):
+            scaler.feature_names_in_ = self.feature_names_in_
+        return scaler
+
+def train_linear_regression_incremental(chunks, target_column: str = 'Credit_Limit'):
+    """Out-of-core обучение по потоку чанков.
+
+    chunks - итератор DataFrame с признаками и целевой колонкой или пар (X, y)
+    (например, PreprocessingPlan.execute_chunks). Возвращает модель и StandardScaler.
+    """
+    model = IncrementalLinearRegression()
+    for chunk in chunks:
+        if isinstance(chunk, tuple):
+            X, y = chunk
+        else:
+            X, y = chunk.drop(columns=target_column), chunk[target_column]
+        model.partial_fit(X, y)
+    print(f"Модель обучена на {model.n_samples_seen_} строках")
+    return model, model.scaler()
+
+def ridge_path(X_train, y_train, alphas) -> tuple:
+    """Коэффициенты Ridge для всей сетки alphas по одному SVD.
+
+    Для центрированной X = U·S·Vᵀ решение Ridge (||y - Xw||² + alpha·||w||², как
+    sklearn.linear_model.Ridge) равно V·diag(s / (s² + alpha))·Uᵀy, поэтому после
+    разложения каждая alpha стоит O(p·min(n, p)).
+    Возвращает (coefs формы (len(alphas), p), intercepts).
+    """
+    X = np.asarray(X_train, dtype=float)
+    y = np.asarray(y_train, dtype=float)
+    mean_x, mean_y = X.mean(axis=0), y.mean()
+    U, s, Vt = np.linalg.svd(X - mean_x, full_matrices=False)
+    uty = U.T @ (y - mean_y)
+    alphas = np.asarray(alphas, dtype=float)
+    shrink = s / (s ** 2 + alphas[:, None])
+    coefs = (shrink * uty) @ Vt
+    intercepts = mean_y - coefs @ mean_x
+    return coefs, intercepts
+
+def enet_regularization_path(X_train, y_train, alphas, l1_ratio: float = 1.0) -> tuple:
+    """Коэффициенты Lasso (l1_ratio=1) / ElasticNet для сетки alphas.
+
+    Используется sklearn enet_path: матрица Грама считается один раз, а координатный спуск
+    для каждой следующей alpha стартует с решения предыдущей (warm start), поэтому
+    alphas перебираются по убыванию. Возвращает (coefs, intercepts) в порядке alphas.
+    """
+    X = np.asarray(X_train, dtype=float)
+    y = np.asarray(y_train, dtype=float)
+    mean_x, mean_y = X.mean(axis=0), y.mean()
+    Xc = X - mean_x
+    yc = y - mean_y
+    alphas = np.asarray(alphas, dtype=float)
+    order = np.argsort(alphas)[::-1]
+    _, path_coefs, _ = enet_path(Xc, yc, l1_ratio=l1_ratio, alphas=alphas[order],
+                                 precompute=Xc.T @ Xc, Xy=Xc.T @ yc)
+    coefs = np.empty((len(alphas), X.shape[1]))
+    coefs[order] = path_coefs.T
+    intercepts = mean_y - coefs @ mean_x
+    return coefs, intercepts
+
+def regularization_path(X_train, y_train, X_test, y_test, alphas=None,
+                        method: str = 'ridge', l1_ratio: float = 0.5) -> tuple:
+    """Путь регуляризации: модели для всей сетки alphas с оценкой через evaluate_model.
+
+    method - 'ridge', 'lasso' или 'elasticnet'. Возвращает таблицу метрик по alpha
+    (отсортирована по alpha) и матрицу коэффициентов (строка на каждую alpha).
+    """
+    if alphas is None:
+        alphas = np.logspace(-3, 3, 50)
+    alphas = np.sort(np.asarray(alphas, dtype=float))
+
+    if method == 'ridge':
+        coefs, intercepts = ridge_path(X_train, y_train, alphas)
+    elif method == 'lasso':
+        coefs, intercepts = enet_regularization_path(X_train, y_train, alphas, l1_ratio=1.0)
+    elif method == 'elasticnet':
+        coefs, intercepts = enet_regularization_path(X_train, y_train, alphas, l1_ratio=l1_ratio)
+    else:
+        raise ValueError(f"Неизвестный метод регуляризации: {method}")
+
+    # Предсказания для всех alpha одним матричным произведением
+    predictions = np.asarray(X_test, dtype=float) @ coefs.T + intercepts
+    rows = []
+    for alpha, y_pred in zip(alphas, predictions.T):
+        metrics = evaluate_model(y_test, y_pred, verbose=False)
+        rows.append({'alpha': alpha, **metrics})
+    results = pd.DataFrame(rows)
+
+    best = results.loc[results['mse'].idxmin()]
+    print(f"=== Путь регуляризации ({method}, {len(alphas)} значений alpha) ===")
+    print(f"Лучшее alpha: {best['alpha']:.4g}, RMSE: {best['rmse']:.2f}, R²: {best['r2']:.4f}")
+    print("=" * 60)
+    return results, coefs
+
+# Данные процесса-обработчика кросс-валидации: массивы, отображенные на общую память
+_cv_shared = {}
+
+def _cv_worker_init(shm_name: str, n_rows: int, n_features: int, n_repeats: int):
+    """Подключение обработчика к общей памяти с X, y и перестановками строк."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    X_size = n_rows * n_features * 8
+    y_size = n_rows * 8
+    _cv_shared['shm'] = shm
+    _cv_shared['X'] = np.ndarray((n_rows, n_features), dtype=np.float64, buffer=shm.buf)
+    _cv_shared['y'] = np.ndarray((n_rows,), dtype=np.float64, buffer=shm.buf, offset=X_size)
+    _cv_shared['perm'] = np.ndarray((n_repeats, n_rows), dtype=np.int64, buffer=shm.buf, offset=X_size + y_size)
+
+def _cv_fold(repeat: int, start: int, stop: int, model) -> dict:
+    """Один фолд: масштабирование и обучение на train, оценка на test."""
+    X, y, perm = _cv_shared['X'], _cv_shared['y'], _cv_shared['perm'][repeat]
+    test_idx = perm[start:stop]
+    train_idx = np.concatenate([perm[:start], perm[stop:]])
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[train_idx])
+    X_test = scaler.transform(X[test_idx])
+    fitted = clone(model).fit(X_train, y[train_idx])
+    return evaluate_model(y[test_idx], fitted.predict(X_test), verbose=False)
+
+def cross_validate(X: pd.DataFrame, y: pd.Series, n_splits: int = 5, n_repeats: int = 1,
+                   random_state: int = 42, model=None, n_jobs: int = None) -> dict:
+    """(Повторная) k-fold кросс-валидация с параллельными фолдами.
+
+    X, y один раз копируются в общую память; обработчики получают только номер повтора
+    и границы тестового фолда в перестановке строк. Масштабирование и обучение
+    выполняются внутри каждого фолда. Возвращает словарь evaluate_model со средними
+    по фолдам, стандартными отклонениями (<метрика>_std) и метриками фолдов ('folds').
+    """
+    if model is None:
+        model = LinearRegression()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    n_rows, n_features = X.shape
+
+    rng = np.random.default_rng(random_state)
+    perms = np.stack([rng.permutation(n_rows) for _ in range(n_repeats)]).astype(np.int64)
+    bounds = np.linspace(0, n_rows, n_splits + 1).astype(int)
+    tasks = [(repeat, bounds[i], bounds[i + 1]) for repeat in range(n_repeats) for i in range(n_splits)]
+
+    shm = shared_memory.SharedMemory(create=True, size=X.nbytes + y.nbytes + perms.nbytes)
+    try:
+        shared = np.ndarray((len(shm.buf),), dtype=np.uint8, buffer=shm.buf)
+        shared[:X.nbytes] = X.view(np.uint8).ravel()
+        shared[X.nbytes:X.nbytes + y.nbytes] = y.view(np.uint8)
+        shared[X.nbytes + y.nbytes:] = perms.view(np.uint8).ravel()
+        del shared
+
+        workers = min(n_jobs or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_cv_worker_init,
+                                 initargs=(shm.name, n_rows, n_features, n_repeats)) as pool:
+            folds = list(pool.map(_cv_fold, *zip(*[(r, a, b, model) for r, a, b in tasks])))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = {}
+    for metric in ('mse', 'rmse', 'mae', 'r2'):
+        values = np.array([fold[metric] for fold in folds])
+        results[metric] = values.mean()
+        results[f'{metric}_std'] = values.std(ddof=1) if len(values) > 1 else 0.0
+    results['folds'] = folds
+
+    print(f"=== Кросс-валидация: {n_splits} фолдов x {n_repeats} повторов ===")
+    print(f"RMSE: {results['rmse']:.2f} ± {results['rmse_std']:.2f}")
+    print(f"MAE: {results['mae']:.2f} ± {results['mae_std']:.2f}")
+    print(f"R²: {results['r2']:.4f} ± {results['r2_std']:.4f}")
+    print("=" * 60)
+    return results
+
+def fold_scaler(model, scaler) -> tuple:
+    """Свертка StandardScaler в коэффициенты: model.predict(scaler.transform(X)) == X·coef + intercept."""
+    coef = np.asarray(model.coef_, dtype=np.float64) / scaler.scale_
+    intercept = float(model.intercept_ - coef @ scaler.mean_)
+    return coef, intercept
+
+def export_model(model, scaler, feature_names: list, categories: dict, path: str,
+                 target: str = 'Credit_Limit') -> str:
+    """Экспорт модели в компактный JSON-артефакт для scoring.ScoringModel.
+
+    StandardScaler сворачивается в коэффициенты и свободный член, categories - словари
+    кодов категорий из data_processing.category_mappings.
+    """
+    coef, intercept = fold_scaler(model, scaler)
+    artifact = {
+        'format': scoring.ARTIFACT_FORMAT,
+        'version': scoring.ARTIFACT_VERSION,
+        'target': target,
+        'features': list(feature_names),
+        'coef': coef.tolist(),
+        'intercept': intercept,
+        'categories': {col: list(values) for col, values in categories.items() if col in feature_names},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+    print(f"Модель экспортирована: {path}")
+    return path
+
+@instrument()
 def predict(model, X: pd.DataFrame):
     """Предсказание на новых данных."""
     return model.predict(X)
 
-def evaluate_model(y_true: pd.Series, y_pred: pd.Series):
-    """Оценка модели линейной регрессии."""
-    mse = mean_squared_error(y_true, y_pred)
-    rmse = np.sqrt(mse)
-    mae = mean_absolute_error(y_true, y_pred)
-    r2 = r2_score(y_true, y_pred)
-    
-    print("=== Оценка линейной регрессии ===")
-    print(f"Среднеквадратичная ошибка (MSE): {mse:.2f}")
-    print(f"Корень из MSE (RMSE): {rmse:.2f}")
-    print(f"Средняя абсолютная ошибка (MAE): {mae:.2f}")
-    print(f"Коэффициент детерминации R²: {r2:.4f}")
-    print("=" * 60)
-    
-    return {'mse': mse, 'rmse': rmse, 'mae': mae, 'r2': r2}
+class RegressionMetrics:
+    """Потоковый расчет MSE, RMSE, MAE и R² за один проход по чанкам.
+
+    Хранит число строк, суммы квадратов и модулей ошибок, среднее и сумму квадратов
+    отклонений y_true (Уэлфорд/Чан) для R². Аккумуляторы с разных процессов
+    объединяются через merge. При n_bootstrap > 0 параллельно копятся те же суммы
+    для n_bootstrap реплик пуассоновского бутстрепа (вес строки ~ Poisson(1)),
+    что дает доверительные интервалы без хранения предсказаний.
+    """
+
+    def __init__(self, n_bootstrap: int = 0, random_state: int = 42):
+        self.n = 0
+        self.sse = 0.0
+        self.sae = 0.0
+        self.mean_y = 0.0
+        self.m2_y = 0.0
+        self.n_bootstrap = n_bootstrap
+        self._rng = np.random.default_rng(random_state)
+        # Суммы по репликам: веса, w·e², w·|e|, w·(y - shift), w·(y - shift)²
+        self._boot = np.zeros((5, n_bootstrap))
+        self._shift = None
+
+    def update(self, y_true, y_pred, block_size: int = 4096):
+        """Учет очередного чанка предсказаний."""
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        n = len(y_true)
+        if n == 0:
+            return self
+        errors = y_true - y_pred
+        self.sse += float(errors @ errors)
+        self.sae += float(np.abs(errors).sum())
+
+        mean = y_true.mean()
+        m2 = float(((y_true - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean_y
+        self.m2_y += m2 + delta * delta * self.n * n / total
+        self.mean_y += delta * n / total
+        self.n = total
+
+        if self.n_bootstrap:
+            if self._shift is None:
+                self._shift = mean
+            centered = y_true - self._shift
+            columns = np.stack([np.ones(n), errors ** 2, np.abs(errors), centered, centered ** 2], axis=1)
+            # Блоками, чтобы матрица весов n_bootstrap x block_size оставалась небольшой
+            for start in range(0, n, block_size):
+                block = columns[start:start + block_size]
+                weights = self._rng.poisson(1.0, size=(self.n_bootstrap, len(block)))
+                self._boot += (weights @ block).T
+        return self
+
+    def merge(self, other: 'RegressionMetrics') -> 'RegressionMetrics':
+        """Слияние с аккумулятором другого чанка или процесса."""
+        if other.n == 0:
+            return self
+        total = self.n + other.n
+        delta = other.mean_y - self.mean_y
+        self.m2_y += other.m2_y + delta * delta * self.n * other.n / total
+        self.mean_y += delta * other.n / total
+        self.sse += other.sse
+        self.sae += other.sae
+        if self.n_bootstrap and other.n_bootstrap == self.n_bootstrap:
+            if self._shift is None:
+                self._boot, self._shift = other._boot.copy(), other._shift
+            else:
+                # Переносим суммы другого аккумулятора к нашему сдвигу y
+                weights, _, _, sum_y, sum_y2 = other._boot
+                d = other._shift - self._shift
+                shifted = other._boot.copy()
+                shifted[3] = sum_y + d * weights
+                shifted[4] = sum_y2 + 2 * d * sum_y + d * d * weights
+                self._boot += shifted
+        self.n = total
+        return self
+
+    @staticmethod
+    def _metrics(n, sse, sae, sst) -> dict:
+        mse = sse / n
+        # Как r2_score: при постоянном y_true R² = 1 для точного предсказания, иначе 0
+        if sst > 0:
+            r2 = 1 - sse / sst
+        else:
+            r2 = 1.0 if sse == 0 else 0.0
+        return {'mse': mse, 'rmse': np.sqrt(mse), 'mae': sae / n, 'r2': r2}
+
+    def result(self) -> dict:
+        """Словарь метрик в формате evaluate_model."""
+        return self._metrics(self.n, self.sse, self.sae, self.m2_y)
+
+    def confidence_intervals(self, alpha: float = 0.05) -> dict:
+        """Перцентильные бутстреп-интервалы (1 - alpha) для каждой метрики: {метрика: (low, high)}."""
+        if not self.n_bootstrap or self.n == 0:
+            return {}
+        weights, sse, sae, sum_y, sum_y2 = self._boot
+        weights = np.maximum(weights, 1)
+        sst = sum_y2 - sum_y ** 2 / weights
+        mse = sse / weights
+        replicas = {
+            'mse': mse,
+            'rmse': np.sqrt(mse),
+            'mae': sae / weights,
+            'r2': np.where(sst > 0, 1 - sse / np.where(sst > 0, sst, 1), 0.0),
+        }
+        return {metric: tuple(np.quantile(values, [alpha / 2, 1 - alpha / 2]))
+                for metric, values in replicas.items()}
+
+def _report_metrics(accumulator: RegressionMetrics, verbose: bool) -> dict:
+    metrics = accumulator.result()
+    mse, rmse, mae, r2 = metrics['mse'], metrics['rmse'], metrics['mae'], metrics['r2']
+    for metric, interval in accumulator.confidence_intervals().items():
+        metrics[f'{metric}_ci'] = interval
+
+    if verbose:
+        print("=== Оценка линейной регрессии ===")
+        print(f"Среднеквадратичная ошибка (MSE): {mse:.2f}")
+        print(f"Корень из MSE (RMSE): {rmse:.2f}")
+        print(f"Средняя абсолютная ошибка (MAE): {mae:.2f}")
+        print(f"Коэффициент детерминации R²: {r2:.4f}")
+        if 'r2_ci' in metrics:
+            low, high = metrics['rmse_ci']
+            print(f"95% интервал RMSE: [{low:.2f}, {high:.2f}]")
+            low, high = metrics['r2_ci']
+            print(f"95% интервал R²: [{low:.4f}, {high:.4f}]")
+        print("=" * 60)
+    return metrics
+
+def evaluate_model_streaming(chunks, n_bootstrap: int = 0, verbose: bool = True) -> dict:
+    """Оценка по потоку пар (y_true, y_pred) без хранения всех предсказаний.
+
+    При n_bootstrap > 0 в результат добавляются доверительные интервалы '<метрика>_ci'.
+    """
+    accumulator = RegressionMetrics(n_bootstrap=n_bootstrap)
+    for y_true, y_pred in chunks:
+        accumulator.update(y_true, y_pred)
+    return _report_metrics(accumulator, verbose)
+
+@instrument()
+def evaluate_model(y_true: pd.Series, y_pred: pd.Series, verbose: bool = True, n_bootstrap: int = 0):
+    """Оценка модели линейной регрессии.
+
+    Метрики считаются RegressionMetrics за один проход; n_bootstrap > 0 добавляет
+    бутстреп-интервалы '<метрика>_ci'.
+    """
+    accumulator = RegressionMetrics(n_bootstrap=n_bootstrap).update(y_true, y_pred)
+    return _report_metrics(accumulator, verbose)
 
 def get_coefficients(model, feature_names: list) -> pd.DataFrame:
     """Получение коэффициентов линейной регрессии."""
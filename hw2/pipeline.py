@@ -0,0 +1,189 @@
+"""Небольшой DAG этапов с кэшем результатов на диске.
+
+Ключ этапа - SHA-256 от исходного кода его функции (и функций из code_deps),
+параметров и ключей входных этапов. Поэтому ключ считается без вычисления данных,
+а изменение кода или параметров этапа пересчитывает только его и все, что ниже по графу.
+Результаты хранятся в pickle-файлах; при превышении max_bytes удаляются давно
+не использованные (LRU по времени последнего обращения).
+
+Этапы ради побочного эффекта (печать, графики) добавляются с cache=False и выполняются
+при каждом запуске. У этапа, записывающего файлы, outputs - список этих файлов:
+если какого-то нет, этап пересчитывается, даже если его результат есть в кэше.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+def file_fingerprint(path: str) -> dict:
+    """Путь, размер и mtime файла - параметр этапа загрузки, меняющийся вместе с файлом."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+class Stage:
+    def __init__(self, name: str, func, inputs: list = None, params: dict = None, code_deps: list = None,
+                 cache: bool = True, outputs: list = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs or [])
+        self.params = dict(params or {})
+        self.code_deps = list(code_deps or [])
+        self.cache = cache
+        self.outputs = list(outputs or [])
+
+    def code_hash(self) -> str:
+        digest = hashlib.sha256()
+        for obj in [self.func] + self.code_deps:
+            digest.update(inspect.getsource(obj).encode())
+        return digest.hexdigest()
+
+class Pipeline:
+    def __init__(self, cache_dir: str = '.stage_cache', max_bytes: int = 1 << 30, force: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.force = force
+        self.stages = {}
+        self._keys = {}
+        self._values = {}
+        self.report = []
+
+    def add(self, name: str, func, inputs: list = None, code_deps: list = None,
+            cache: bool = True, outputs: list = None, **params) -> 'Pipeline':
+        """Добавление этапа; inputs - имена этапов, чьи результаты передаются в func по порядку.
+
+        cache=False - этап с побочным эффектом, выполняется при каждом запуске;
+        outputs - файлы этапа, при отсутствии любого из них кэш этапа не используется.
+        """
+        for dependency in inputs or []:
+            if dependency not in self.stages:
+                raise ValueError(f"Этап {name}: неизвестный входной этап {dependency}")
+        self.stages[name] = Stage(name, func, inputs, params, code_deps, cache, outputs)
+        return self
+
+    def key(self, name: str) -> str:
+        """Ключ этапа (Merkle-хэш: код, параметры, ключи входов)."""
+        if name not in self._keys:
+            stage = self.stages[name]
+            payload = {
+                'name': name,
+                'code': stage.code_hash(),
+                'params': json.dumps(stage.params, sort_keys=True, default=repr),
+                'inputs': [self.key(dependency) for dependency in stage.inputs],
+            }
+            self._keys[name] = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        return self._keys[name]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{self.key(name)[:24]}.pkl")
+
+    def _load(self, name: str):
+        path = self._path(name)
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+        os.utime(path)  # отметка использования для LRU
+        return value
+
+    def _store(self, name: str, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _cached(self, name: str) -> bool:
+        """Можно ли взять результат этапа из кэша: он есть на диске и все outputs на месте."""
+        stage = self.stages[name]
+        if not stage.cache or self.force or not os.path.exists(self._path(name)):
+            return False
+        return all(os.path.exists(path) for path in stage.outputs)
+
+    def _value(self, name: str):
+        """Результат этапа: из памяти, из кэша или вычислением (входы - рекурсивно)."""
+        if name in self._values:
+            return self._values[name]
+        stage = self.stages[name]
+        if self._cached(name):
+            start = time.perf_counter()
+            value = self._load(name)
+            self.report.append((name, 'hit', time.perf_counter() - start))
+        else:
+            args = [self._value(dependency) for dependency in stage.inputs]
+            start = time.perf_counter()
+            value = stage.func(*args, **stage.params)
+            self.report.append((name, 'computed' if stage.cache else 'executed', time.perf_counter() - start))
+            if stage.cache:
+                self._store(name, value)
+        self._values[name] = value
+        return value
+
+    def run(self, targets: list = None, explain: bool = False) -> dict:
+        """Выполнение этапов targets (по умолчанию - всех) в порядке добавления.
+
+        Этап, результат которого уже есть в кэше, не выполняется, а его входы не
+        загружаются; этапы с cache=False выполняются всегда. Возвращает словарь
+        результатов загруженных или вычисленных этапов.
+        """
+        self.report = []
+        # Результаты этапов без кэша от прошлого запуска не переиспользуются
+        self._values = {name: value for name, value in self._values.items() if self.stages[name].cache}
+        skipped = []
+        for name in targets or list(self.stages):
+            if not self._cached(name):
+                self._value(name)
+            else:
+                skipped.append(name)
+        # Пропущенными считаются этапы, результат которых не понадобился и другим этапам
+        for name in skipped:
+            if name not in self._values:
+                os.utime(self._path(name))
+                self.report.append((name, 'skipped', 0.0))
+        self.evict()
+        if explain:
+            self.explain()
+        return dict(self._values)
+
+    def get(self, name: str):
+        """Результат этапа (из кэша или с вычислением)."""
+        return self._value(name)
+
+    def call(self, name: str):
+        """Выполнение этапа без его кэша (для этапов с побочным эффектом, например графиков).
+
+        Входы берутся из кэша или вычисляются как обычно.
+        """
+        function, args, params = self.task(name)
+        return function(*args, **params)
+
+    def task(self, name: str) -> tuple:
+        """(функция, входы, параметры) этапа без его выполнения - например, для отрисовки в другом процессе."""
+        stage = self.stages[name]
+        return stage.func, tuple(self._value(dependency) for dependency in stage.inputs), stage.params
+
+    def explain(self):
+        """Какие этапы взяты из кэша, а какие пересчитаны."""
+        statuses = {'hit': 'загружен из кэша', 'skipped': 'в кэше, пропущен', 'computed': 'пересчитан',
+                    'executed': 'выполнен без кэша'}
+        print("=== Этапы конвейера ===")
+        for name, status, seconds in self.report:
+            print(f"{name:25s}: {statuses[status]:18s} {seconds * 1000:9.1f} мс  {self.key(name)[:12]}")
+        print("=" * 60)
+
+    def evict(self):
+        """Удаление давно не использованных результатов сверх max_bytes."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.pkl'):
+                path = os.path.join(self.cache_dir, file_name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
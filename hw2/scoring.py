@@ -0,0 +1,88 @@
+"""Скоринг кредитного лимита по экспортированной модели (ml_module.export_model).
+
+Модуль намеренно зависит только от NumPy: артефакт - JSON с коэффициентами, в которые
+уже свернут StandardScaler, и словарями категорий, поэтому предсказание - одно
+матричное умножение без sklearn и pickle.
+"""
+import json
+
+import numpy as np
+
+ARTIFACT_FORMAT = 'credit-limit-linear'
+ARTIFACT_VERSION = 1
+
+class ScoringModel:
+    """Линейная модель из артефакта: y = X·coef + intercept по исходным (немасштабированным) признакам."""
+
+    def __init__(self, features: list, coef, intercept: float, categories: dict, target: str = 'Credit_Limit'):
+        self.features = list(features)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.categories = {col: list(values) for col, values in categories.items()}
+        self.target = target
+        # Значение категории -> код (как cat.codes в prepare_data)
+        self._codes = {col: {value: code for code, value in enumerate(values)}
+                       for col, values in self.categories.items()}
+
+    @classmethod
+    def load(cls, path: str) -> 'ScoringModel':
+        """Загрузка артефакта с проверкой формата и версии."""
+        with open(path, encoding='utf-8') as f:
+            artifact = json.load(f)
+        if artifact.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Файл {path} не является артефактом модели кредитного лимита")
+        if artifact.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия артефакта: {artifact.get('version')}")
+        return cls(artifact['features'], artifact['coef'], artifact['intercept'],
+                   artifact['categories'], artifact.get('target', 'Credit_Limit'))
+
+    def encode_column(self, name: str, values) -> np.ndarray:
+        """Кодирование колонки: категориальные значения заменяются кодами, остальные - в float.
+
+        Числовые значения категориальной колонки считаются уже закодированными (выход prepare_data).
+        Пропуски и неизвестные категории - ValueError: модель sklearn на таких данных
+        тоже не дает предсказания, и тихий код -1 или NaN разошелся бы с ней.
+        """
+        values = np.asarray(values)
+        if name in self._codes and values.dtype.kind not in 'iuf':
+            items = values.tolist()
+            if any(_is_missing(value) for value in items):
+                raise ValueError(f"Признак {name}: пропущенные значения")
+            codes = self._codes[name]
+            unknown = sorted({value for value in items if value not in codes}, key=str)
+            if unknown:
+                raise ValueError(f"Признак {name}: значения вне категорий модели {unknown}")
+            return np.array([codes[value] for value in items], dtype=np.float64)
+        try:
+            encoded = values.astype(np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Признак {name}: нечисловые значения") from None
+        if np.isnan(encoded).any():
+            raise ValueError(f"Признак {name}: пропущенные значения")
+        return encoded
+
+    def encode(self, X) -> np.ndarray:
+        """Матрица признаков из DataFrame, списка словарей или словаря колонок."""
+        if isinstance(X, np.ndarray):
+            return X.astype(np.float64, copy=False)
+        if isinstance(X, dict):
+            X = [X]
+        if isinstance(X, list):
+            missing = [name for name in self.features if any(name not in record for record in X)]
+            if missing:
+                raise ValueError(f"Нет признаков: {missing}")
+            X = {name: [record[name] for record in X] for name in self.features}
+        missing = [name for name in self.features if name not in X]
+        if missing:
+            raise ValueError(f"Нет признаков: {missing}")
+        return np.column_stack([self.encode_column(name, X[name]) for name in self.features])
+
+    def predict(self, X) -> np.ndarray:
+        """Предсказание одним матричным умножением."""
+        return self.encode(X) @ self.coef + self.intercept
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+def load_model(path: str) -> ScoringModel:
+    return ScoringModel.load(path)
@@ -0,0 +1,142 @@
+"""Асинхронный онлайн-скоринг кредитного лимита с микробатчингом.
+
+Запросы (записи одного клиента) складываются в очередь и группируются в батчи по
+размеру или по истечении задержки; на батч выполняется одно векторное предсказание
+ScoringModel. Кодирование категорий берется из артефакта модели - тех же словарей,
+что использует prepare_data при обучении.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+import scoring
+
+class MicroBatchScorer:
+    """Очередь запросов с группировкой в батчи по max_batch_size или max_delay секунд."""
+
+    def __init__(self, model: scoring.ScoringModel, max_batch_size: int = 64,
+                 max_delay: float = 0.005, history: int = 10_000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = Counter()
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановка после обработки уже поставленных в очередь запросов."""
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def score(self, record: dict) -> float:
+        """Предсказание для одной записи клиента."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self) -> list:
+        """Первый запрос ждем без ограничения, остальные - до заполнения батча или дедлайна."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score_batch(self, batch: list) -> list:
+        """Результат (предсказание или исключение) для каждого запроса батча.
+
+        Если батч целиком не предсказывается, записи оцениваются по одной: ошибка
+        одной записи не должна отклонять остальные запросы батча.
+        """
+        try:
+            return [float(prediction) for prediction in self.model.predict([record for record, _, _ in batch])]
+        except Exception:
+            results = []
+            for record, _, _ in batch:
+                try:
+                    results.append(float(self.model.predict([record])[0]))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            results = self._score_batch(batch)
+            now = time.perf_counter()
+            for (_, future, started), result in zip(batch, results):
+                if not future.done():
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                # Задержка учитывается и для отклоненных запросов
+                self.latencies.append(now - started)
+            self.batch_sizes[len(batch)] += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Задержки (p50/p99, мс) и гистограмма размеров батчей."""
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': len(latencies),
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+        }
+
+async def _handle_client(scorer: MicroBatchScorer, reader, writer):
+    """Протокол JSON Lines: строка с записью клиента -> строка с предсказанием."""
+    try:
+        while line := await reader.readline():
+            try:
+                prediction = await scorer.score(json.loads(line))
+                # NaN и бесконечность не записываются в JSON - такой ответ - ошибка записи
+                if not math.isfinite(prediction):
+                    raise ValueError(f"Некорректное предсказание: {prediction}")
+                response = {'prediction': prediction}
+            except Exception as e:
+                response = {'error': str(e)}
+            writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+            await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(model_path: str = 'credit_limit_model.json', host: str = '127.0.0.1', port: int = 8765, **kwargs):
+    """TCP-сервер скоринга (JSON Lines) поверх MicroBatchScorer."""
+    model = scoring.load_model(model_path)
+    async with MicroBatchScorer(model, **kwargs) as scorer:
+        server = await asyncio.start_server(lambda r, w: _handle_client(scorer, r, w), host, port)
+        print(f"Сервис скоринга запущен на {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,90 @@
+import functools
+import gzip
+import http.server
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import data_loader
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+
+@pytest.fixture(scope='module')
+def sample() -> pd.DataFrame:
+    return pd.read_csv(DATA_PATH, nrows=500)
+
+@pytest.fixture
+def http_dir(tmp_path):
+    """Локальный HTTP-сервер, раздающий tmp_path: (каталог, базовый URL)."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_http_sources_match_local(http_dir, sample):
+    directory, url = http_dir
+    sample.to_csv(directory / 'part.csv', index=False)
+    sample.to_csv(directory / 'part.csv.gz', index=False, compression='gzip')
+    sample.to_json(directory / 'part.jsonl.gz', orient='records', lines=True, compression='gzip')
+    expected = data_loader.read_csv_source(str(directory / 'part.csv'))
+
+    for name in ['part.csv', 'part.csv.gz', 'part.jsonl.gz']:
+        df = data_loader.load_from_sources([f"{url}/{name}"], processes=1)
+        assert df is not None, name
+        pd.testing.assert_frame_equal(df, expected, check_exact=False)
+
+def test_http_gzip_content_encoding(http_dir, sample, monkeypatch):
+    directory, url = http_dir
+    (directory / 'part.csv').write_bytes(gzip.compress(sample.to_csv(index=False).encode()))
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        body = open(path, 'rb')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        return body
+
+    monkeypatch.setattr(http.server.SimpleHTTPRequestHandler, 'send_head', send_head)
+    df = data_loader.read_api_source(f"{url}/part.csv")
+    assert len(df) == len(sample)
+
+@pytest.fixture(scope='module')
+def untyped() -> pd.DataFrame:
+    return data_loader.load_credit_card_data(DATA_PATH)
+
+def test_typed_load_matches_untyped(untyped):
+    typed = data_loader.load_credit_card_data(DATA_PATH, typed=True)
+    assert list(typed.columns) == list(data_loader.CREDIT_CARD_SCHEMA)
+    assert typed.dtypes.to_dict() == {col: pd.api.types.pandas_dtype(dtype)
+                                      for col, dtype in data_loader.CREDIT_CARD_SCHEMA.items()}
+    pd.testing.assert_frame_equal(typed, untyped[list(typed.columns)].astype(data_loader.CREDIT_CARD_SCHEMA))
+    for col in data_loader.CATEGORIES:
+        assert (typed[col].astype(object) == untyped[col]).all(), col
+    numeric = [col for col in typed.columns if col not in data_loader.CATEGORIES]
+    pd.testing.assert_frame_equal(typed[numeric].astype('float64'), untyped[numeric].astype('float64'),
+                                  rtol=1e-6)
+
+@pytest.mark.parametrize('chunksize', [1000, 100_000])
+def test_chunked_load_matches_typed(untyped, chunksize):
+    typed = data_loader.load_credit_card_data(DATA_PATH, typed=True)
+    chunks = list(data_loader.iter_credit_card_data(DATA_PATH, chunksize=chunksize))
+    assert len(chunks) == -(-len(untyped) // chunksize)
+    pd.testing.assert_frame_equal(pd.concat(chunks), typed)
+
+def test_unknown_category_raises(tmp_path, sample):
+    broken = sample.copy()
+    broken.loc[broken.index[-1], 'Card_Category'] = 'Diamond'
+    path = tmp_path / 'broken.csv'
+    broken.to_csv(path, index=False)
+    assert data_loader.load_credit_card_data(str(path), typed=True) is None
+    with pytest.raises(ValueError, match='Diamond'):
+        list(data_loader.iter_credit_card_data(str(path), chunksize=100))
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+import data_processing
+from data_processing import DataProfile, QuantileSketch
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+# Допустимая ошибка ранга для k=200 (см. docstring QuantileSketch)
+MAX_RANK_ERROR = 0.017
+
+def rank_error(sketch: QuantileSketch, values: np.ndarray) -> float:
+    """Наибольшее отклонение ранга оценок скетча от точных рангов (доля от числа значений)."""
+    ordered = np.sort(values)
+    estimates = [sketch.quantile(q) for q in QUANTILES]
+    ranks = np.searchsorted(ordered, estimates, side='left') / len(ordered)
+    return float(np.max(np.abs(ranks - QUANTILES)))
+
+@pytest.fixture(params=['normal', 'lognormal'])
+def values(request) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    if request.param == 'normal':
+        return rng.normal(size=200_000)
+    return rng.lognormal(size=200_000)
+
+@pytest.mark.parametrize('chunksize', [1_000, 100_000, 200_000])
+def test_rank_error(values, chunksize):
+    sketch = QuantileSketch()
+    for start in range(0, len(values), chunksize):
+        sketch.update(values[start:start + chunksize])
+    assert sketch.count == len(values)
+    assert rank_error(sketch, values) < MAX_RANK_ERROR
+
+def test_merge(values):
+    parts = np.array_split(values, 4)
+    sketches = [QuantileSketch(seed=i) for i in range(len(parts))]
+    for sketch, part in zip(sketches, parts):
+        sketch.update(part)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    assert merged.count == len(values)
+    assert sum(len(items) for items in merged.levels) < 3 * merged.k
+    assert rank_error(merged, values) < MAX_RANK_ERROR
+
+def test_small_input_is_exact():
+    values = np.arange(101, dtype=float)
+    sketch = QuantileSketch()
+    sketch.update(values)
+    for q in (0.0, 0.25, 0.5, 0.75, 1.0):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q))
+
+def test_ignores_nan_and_empty():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([np.nan, 1.0, np.nan, 3.0])
+    assert sketch.count == 2
+    assert sketch.quantile(0.5) == pytest.approx(2.0)
+
+def test_profile_ignores_unseen_categories():
+    categories = pd.CategoricalDtype(['Blue', 'Gold', 'Platinum', 'Silver'])
+    df = pd.DataFrame({'Card_Category': pd.Series(['Blue', 'Blue', None, 'Blue'], dtype=categories)})
+    profile = DataProfile().update(df.iloc[:2]).update(df.iloc[2:])
+    assert profile.cardinality('Card_Category') == 1
+    assert profile.top_values('Card_Category') == [('Blue', 3)]
+    assert profile.columns['Card_Category']['nulls'] == 1
+    assert round(profile.columns['Card_Category']['hll'].estimate()) == 1
+
+def test_profile_keeps_column_state_between_chunks():
+    profile = DataProfile().update(pd.DataFrame({'x': [1.0, 2.0]}))
+    column = profile.columns['x']
+    profile.update(pd.DataFrame({'x': [3.0]}))
+    assert profile.columns['x'] is column
+    assert profile.mean('x') == pytest.approx(2.0)
+
+def test_prepared_chunks_read_only_plan_columns(monkeypatch):
+    X, y = data_processing.prepare_data(data_loader.load_credit_card_data(DATA_PATH, typed=True))
+    read_columns = []
+    iter_chunks = data_loader.iter_credit_card_data
+
+    def tracking(file_path, chunksize, columns):
+        read_columns.append(columns)
+        return iter_chunks(file_path, chunksize, columns)
+
+    monkeypatch.setattr(data_loader, 'iter_credit_card_data', tracking)
+    parts = list(data_processing.iter_prepared_chunks(DATA_PATH, chunksize=3000))
+    pd.testing.assert_frame_equal(pd.concat([part[0] for part in parts]), X)
+    pd.testing.assert_series_equal(pd.concat([part[1] for part in parts]), y)
+    assert read_columns and all(set(columns).isdisjoint(data_processing.COLUMNS_TO_DROP) for columns in read_columns)
+
+@pytest.fixture
+def numeric_frame() -> pd.DataFrame:
+    df = data_loader.load_credit_card_data(DATA_PATH).select_dtypes('number')
+    df.loc[df.index[::7], 'Customer_Age'] = np.nan
+    df['Constant'] = 1.0
+    return df
+
+def test_correlation_matches_pandas(numeric_frame):
+    expected = numeric_frame.corr()['Credit_Limit'].drop('Credit_Limit')
+    for chunksize in (1_000, 100_000):
+        data_processing._correlation_cache.clear()
+        result = data_processing.correlation_with_target(numeric_frame, chunksize=chunksize)
+        pd.testing.assert_series_equal(result, expected, check_names=False, rtol=1e-12, atol=1e-12)
+
+def test_correlation_cache_returns_copies(numeric_frame):
+    data_processing._correlation_cache.clear()
+    first = data_processing.correlation_with_target(numeric_frame)
+    expected = first.copy()
+    first[:] = 0.0
+    pd.testing.assert_series_equal(data_processing.correlation_with_target(numeric_frame), expected)
+
+def test_correlation_cache_sees_changed_values(numeric_frame):
+    data_processing._correlation_cache.clear()
+    before = data_processing.correlation_with_target(numeric_frame)
+    changed = numeric_frame.copy()
+    changed.loc[changed.index[1], 'Total_Trans_Amt'] += 1e6
+    after = data_processing.correlation_with_target(changed)
+    assert after['Total_Trans_Amt'] != before['Total_Trans_Amt']
+    pd.testing.assert_series_equal(after, changed.corr()['Credit_Limit'].drop('Credit_Limit'),
+                                   check_names=False, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+import pytest
+
+import data_loader
+import instrumentation
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+
+@pytest.fixture
+def profiling():
+    state = dict(instrumentation._state)
+    instrumentation.records.clear()
+    instrumentation.enable()
+    yield instrumentation.records
+    instrumentation._state.update(state)
+    instrumentation.records.clear()
+
+def test_warm_cache_load_is_recorded(profiling, tmp_path):
+    path = str(tmp_path / 'BankChurners.csv')
+    shutil.copy(DATA_PATH, path)
+    data_loader.load_credit_card_data_cached(path)
+    data_loader.load_credit_card_data_cached(path)
+    stages = [record['stage'] for record in profiling]
+    # Первый вызов собирает кэш (внутри - чтение CSV), второй читает только кэш
+    assert stages == ['load_credit_card_data', 'load_credit_card_data_cached', 'load_credit_card_data_cached']
+    assert profiling[-1]['rows_out'] == 10127
+
+def test_enable_keeps_environment_settings(profiling, tmp_path):
+    instrumentation._state['cprofile_dir'] = str(tmp_path)
+    instrumentation.enable()
+    assert instrumentation._state['cprofile_dir'] == str(tmp_path)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.preprocessing import StandardScaler
+
+import ml_module
+
+@pytest.fixture(scope='module')
+def regression() -> tuple:
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(loc=[0, 50, -3, 1000], scale=[1, 10, 0.1, 300], size=(5000, 4)),
+                     columns=['a', 'b', 'c', 'd'])
+    X['constant'] = 7.0
+    y = pd.Series(X.to_numpy()[:, :4] @ [3.0, -0.5, 20.0, 0.01] + rng.normal(scale=2.0, size=len(X)))
+    return X, y
+
+@pytest.mark.parametrize('chunksize', [1, 333, 5000])
+def test_incremental_matches_linear_regression(regression, chunksize):
+    X, y = regression
+    scaler = StandardScaler().fit(X)
+    expected = LinearRegression().fit(scaler.transform(X), y)
+
+    model = ml_module.IncrementalLinearRegression().fit(X, y, chunksize=chunksize)
+    np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-7, atol=1e-8)
+    assert model.intercept_ == pytest.approx(expected.intercept_)
+    np.testing.assert_allclose(model.scaler().transform(X.to_numpy()), scaler.transform(X), atol=1e-9)
+    np.testing.assert_allclose(model.predict(model.transform(X)), expected.predict(scaler.transform(X)))
+
+def test_partial_fit_chunks_of_frames(regression):
+    X, y = regression
+    scaler = StandardScaler().fit(X)
+    expected = LinearRegression().fit(scaler.transform(X), y)
+    chunks = [(X.iloc[start:start + 700], y.iloc[start:start + 700]) for start in range(0, len(X), 700)]
+
+    model, fitted_scaler = ml_module.train_linear_regression_incremental(iter(chunks))
+    assert model.n_samples_seen_ == len(X)
+    np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-7, atol=1e-8)
+    assert list(fitted_scaler.feature_names_in_) == list(X.columns)
+
+def sklearn_metrics(y_true, y_pred) -> dict:
+    mse = mean_squared_error(y_true, y_pred)
+    return {'mse': mse, 'rmse': np.sqrt(mse), 'mae': mean_absolute_error(y_true, y_pred),
+            'r2': r2_score(y_true, y_pred)}
+
+@pytest.mark.parametrize('parts', [1, 3, 17])
+def test_merged_metrics_match_sklearn(parts):
+    rng = np.random.default_rng(1)
+    y_true = rng.lognormal(mean=8, sigma=1, size=10_001)
+    y_pred = y_true + rng.normal(scale=500, size=len(y_true))
+    accumulators = [ml_module.RegressionMetrics().update(true, pred)
+                    for true, pred in zip(np.array_split(y_true, parts), np.array_split(y_pred, parts))]
+    merged = accumulators[0]
+    for accumulator in accumulators[1:]:
+        merged.merge(accumulator)
+
+    result = merged.result()
+    for metric, expected in sklearn_metrics(y_true, y_pred).items():
+        assert result[metric] == pytest.approx(expected, rel=1e-10), metric
+
+def test_streaming_metrics_match_sklearn():
+    rng = np.random.default_rng(2)
+    y_true = rng.normal(loc=5000, scale=100, size=3000)
+    y_pred = y_true + rng.normal(scale=30, size=len(y_true))
+    chunks = [(y_true[start:start + 256], y_pred[start:start + 256]) for start in range(0, len(y_true), 256)]
+    result = ml_module.evaluate_model_streaming(chunks, n_bootstrap=50, verbose=False)
+    for metric, expected in sklearn_metrics(y_true, y_pred).items():
+        assert result[metric] == pytest.approx(expected, rel=1e-10), metric
+        low, high = result[f'{metric}_ci']
+        assert low <= expected <= high
+
+def test_constant_target_matches_r2_score():
+    y_true = np.full(10, 3.0)
+    assert ml_module.evaluate_model(y_true, y_true, verbose=False)['r2'] == r2_score(y_true, y_true)
+    assert ml_module.evaluate_model(y_true, y_true + 1, verbose=False)['r2'] == r2_score(y_true, y_true + 1)
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+import data_loader
+import data_processing
+import ml_module
+import scoring
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BankChurners.csv')
+
+@pytest.fixture(scope='module')
+def trained(tmp_path_factory):
+    """Модель конвейера main.py, ее артефакт и исходные данные."""
+    df = data_loader.load_credit_card_data(DATA_PATH)
+    X, y = data_processing.prepare_data(df)
+    X_train, X_test, y_train, y_test = ml_module.split_data(X, y)
+    X_train_scaled, X_test_scaled, scaler = ml_module.scale_features(X_train, X_test)
+    model = ml_module.train_linear_regression(X_train_scaled, y_train)
+    path = str(tmp_path_factory.mktemp('model') / 'model.json')
+    ml_module.export_model(model, scaler, X.columns.tolist(), data_processing.category_mappings(df), path)
+    return {
+        'df': df, 'X_test': X_test, 'expected': model.predict(X_test_scaled),
+        'artifact': scoring.load_model(path),
+    }
+
+def test_prepared_features_match_sklearn(trained):
+    predictions = trained['artifact'].predict(trained['X_test'])
+    np.testing.assert_allclose(predictions, trained['expected'], rtol=1e-9, atol=1e-6)
+
+def test_raw_records_match_sklearn(trained):
+    raw = trained['df'].loc[trained['X_test'].index]
+    np.testing.assert_allclose(trained['artifact'].predict(raw), trained['expected'], rtol=1e-9, atol=1e-6)
+    records = raw.to_dict('records')
+    np.testing.assert_allclose(trained['artifact'].predict(records), trained['expected'], rtol=1e-9, atol=1e-6)
+
+def test_unknown_category_raises(trained):
+    record = trained['df'].iloc[0].to_dict()
+    record['Card_Category'] = 'Diamond'
+    with pytest.raises(ValueError, match='Card_Category'):
+        trained['artifact'].predict(record)
+
+@pytest.mark.parametrize('field', ['Card_Category', 'Customer_Age'])
+def test_missing_feature_raises(trained, field):
+    record = trained['df'].iloc[0].to_dict()
+    del record[field]
+    with pytest.raises(ValueError, match=field):
+        trained['artifact'].predict(record)
+    record[field] = None
+    with pytest.raises(ValueError, match=field):
+        trained['artifact'].predict(record)
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from scoring_service import MicroBatchScorer, _handle_client
+
+class StandInModel:
+    """Замена ScoringModel: предсказание - 2·x, запись с bad - ValueError для всего вызова."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, records: list) -> list:
+        self.calls.append(len(records))
+        if any('bad' in record for record in records):
+            raise ValueError('bad record')
+        return [2.0 * record['x'] for record in records]
+
+async def score_all(scorer: MicroBatchScorer, records: list) -> list:
+    return await asyncio.gather(*(scorer.score(record) for record in records), return_exceptions=True)
+
+def test_requests_grouped_by_batch_size():
+    async def run():
+        async with MicroBatchScorer(StandInModel(), max_batch_size=4, max_delay=0.05) as scorer:
+            results = await score_all(scorer, [{'x': i} for i in range(10)])
+        return scorer, results
+
+    scorer, results = asyncio.run(run())
+    assert results == [2.0 * i for i in range(10)]
+    assert scorer.batch_sizes == {4: 2, 2: 1}
+    assert scorer.stats()['requests'] == 10
+
+def test_bad_record_fails_alone():
+    async def run():
+        async with MicroBatchScorer(StandInModel(), max_batch_size=8, max_delay=0.05) as scorer:
+            results = await score_all(scorer, [{'x': 1}, {'x': 2, 'bad': True}, {'x': 3}])
+        return scorer, results
+
+    scorer, results = asyncio.run(run())
+    assert results[0] == 2.0 and results[2] == 6.0
+    assert isinstance(results[1], ValueError)
+    assert scorer.batch_sizes == {3: 1}
+    assert len(scorer.latencies) == 3
+
+def test_partial_batch_flushed_after_max_delay():
+    async def run():
+        async with MicroBatchScorer(StandInModel(), max_batch_size=64, max_delay=0.05) as scorer:
+            start = time.perf_counter()
+            result = await scorer.score({'x': 5})
+            return scorer, result, time.perf_counter() - start
+
+    scorer, result, elapsed = asyncio.run(run())
+    assert result == 10.0
+    assert scorer.batch_sizes == {1: 1}
+    assert 0.04 <= elapsed < 1.0
+
+@pytest.mark.parametrize('record, expected', [
+    ({'x': 1}, {'prediction': 2.0}),
+    ({'x': float('nan')}, 'error'),
+    ({'x': 1, 'bad': True}, 'error'),
+])
+def test_client_gets_valid_json(record, expected):
+    async def run():
+        async with MicroBatchScorer(StandInModel(), max_delay=0.001) as scorer:
+            server = await asyncio.start_server(lambda r, w: _handle_client(scorer, r, w), '127.0.0.1', 0)
+            async with server:
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(json.dumps(record).encode() + b'\n')
+                await writer.drain()
+                line = await reader.readline()
+                writer.close()
+                await writer.wait_closed()
+        return line
+
+    response = json.loads(asyncio.run(run()), parse_constant=lambda name: pytest.fail(f"{name} в ответе"))
+    if expected == 'error':
+        assert set(response) == {'error'}
+    else:
+        assert response == expected
@@ -1,41 +1,124 @@
+import rendering
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import pandas as pd
 import numpy as np
+import data_processing
 
-def plot_histogram(data: pd.Series, title: str, xlabel: str, ylabel: str, bins: int = 30):
-    """Создание гистограммы."""
+class StreamingHistogram:
+    """Гистограмма с фиксированными границами, накапливаемая по чанкам.
+
+    Память - только массив счетчиков, поэтому подходит для любого числа строк.
+    """
+
+    def __init__(self, bins: int = 30, range: tuple = None, edges=None):
+        if edges is None:
+            if range is None:
+                raise ValueError("Нужно указать range или edges")
+            edges = np.linspace(range[0], range[1], bins + 1)
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.counts += np.histogram(values[~np.isnan(values)], bins=self.edges)[0]
+        return self
+
+    def merge(self, other: 'StreamingHistogram'):
+        self.counts += other.counts
+        return self
+
+def histogram_counts(data, bins: int = 30) -> tuple:
+    """Счетчики и границы гистограммы (пропуски отбрасываются)."""
+    values = np.asarray(data, dtype=float)
+    return np.histogram(values[~np.isnan(values)], bins=bins)
+
+def stratified_sample(values, n: int, strata: int = 20, random_state: int = 42) -> np.ndarray:
+    """Детерминированная стратифицированная выборка индексов.
+
+    Значения делятся на strata квантильных групп, из каждой берется доля пропорционально
+    ее размеру (не меньше одной точки), поэтому хвосты распределения не теряются.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) <= n:
+        return np.arange(len(values))
+    rng = np.random.default_rng(random_state)
+    edges = np.unique(np.nanquantile(values, np.linspace(0, 1, strata + 1)))
+    groups = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    order = np.argsort(groups, kind='stable')
+    starts = np.searchsorted(groups[order], np.arange(len(edges) - 1))
+    ends = np.append(starts[1:], len(order))
+    selected = []
+    for start, end in zip(starts, ends):
+        size = end - start
+        if size == 0:
+            continue
+        take = max(1, round(n * size / len(values)))
+        selected.append(rng.choice(order[start:end], size=min(take, size), replace=False))
+    return np.sort(np.concatenate(selected))
+
+def plot_histogram_counts(counts, edges, title: str, xlabel: str, ylabel: str):
+    """Гистограмма по заранее посчитанным счетчикам (np.histogram или StreamingHistogram)."""
+    edges = np.asarray(edges)
     plt.figure(figsize=(10, 6))
-    plt.hist(data, bins=bins, alpha=0.7, color='skyblue', edgecolor='black')
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, color='skyblue', edgecolor='black')
     plt.title(title, fontsize=14)
     plt.xlabel(xlabel)
     plt.ylabel(ylabel)
     plt.grid(True, alpha=0.3)
-    plt.show()
+    rendering.show()
+
+def plot_histogram(data: pd.Series, title: str, xlabel: str, ylabel: str, bins: int = 30):
+    """Создание гистограммы (счетчики считаются заранее, в matplotlib передаются только столбцы)."""
+    counts, edges = histogram_counts(data, bins)
+    plot_histogram_counts(counts, edges, title, xlabel, ylabel)
+
+def plot_predictions(y_true: pd.Series, y_pred: pd.Series, num_points: int = 20, sample: bool = False):
+    """Визуализация истинных и предсказанных значений.
+
+    sample=True берет num_points наблюдений стратифицированной выборкой по y_true
+    вместо первых num_points.
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    index = stratified_sample(y_true, num_points) if sample else np.arange(min(num_points, len(y_true)))
+    positions = np.arange(len(index))
 
-def plot_predictions(y_true: pd.Series, y_pred: pd.Series, num_points: int = 20):
-    """Визуализация истинных и предсказанных значений."""
     plt.figure(figsize=(12, 6))
-    plt.scatter(range(num_points), y_true[:num_points], color='blue', label='Истинные значения', alpha=0.7)
-    plt.scatter(range(num_points), y_pred[:num_points], color='red', label='Предсказанные значения', alpha=0.7)
+    plt.scatter(positions, y_true[index], color='blue', label='Истинные значения', alpha=0.7)
+    plt.scatter(positions, y_pred[index], color='red', label='Предсказанные значения', alpha=0.7)
     plt.xlabel('Индекс наблюдения')
     plt.ylabel('Кредитный лимит')
     plt.title('Истинные и предсказанные значения кредитного лимита')
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.show()
+    rendering.show()
+
+def plot_residuals(y_true: pd.Series, y_pred: pd.Series, max_points: int = 50_000, bins: int = 200):
+    """Визуализация остатков регрессии.
 
-def plot_residuals(y_true: pd.Series, y_pred: pd.Series):
-    """Визуализация остатков регрессии."""
-    residuals = y_true - y_pred
+    До max_points точек рисуется диаграмма рассеяния, больше - плотность на сетке bins x bins
+    (np.histogram2d, растровое изображение), время отрисовки от числа строк не зависит.
+    """
+    y_pred = np.asarray(y_pred, dtype=float)
+    residuals = np.asarray(y_true, dtype=float) - y_pred
     
     plt.figure(figsize=(10, 5))
-    plt.scatter(y_pred, residuals, alpha=0.7, color='green')
+    if len(residuals) <= max_points:
+        plt.scatter(y_pred, residuals, alpha=0.7, color='green')
+    else:
+        counts, x_edges, y_edges = np.histogram2d(y_pred, residuals, bins=bins)
+        counts = np.ma.masked_equal(counts.T, 0)
+        plt.imshow(counts, origin='lower', aspect='auto', cmap='Greens', interpolation='nearest',
+                   extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+                   norm=LogNorm())
+        plt.colorbar(label='Количество наблюдений')
     plt.axhline(y=0, color='red', linestyle='--', linewidth=2)
     plt.xlabel('Предсказанные значения')
     plt.ylabel('Остатки')
     plt.title('Остатки линейной регрессии')
     plt.grid(True, alpha=0.3)
-    plt.show()
+    rendering.show()
 
 def plot_feature_importance(coefficients_df: pd.DataFrame, title: str = "Важность признаков"):
     """Визуализация важности признаков по коэффициентам."""
@@ -52,7 +135,7 @@ def plot_feature_importance(coefficients_df: pd.DataFrame, title: str = "Важ
     plt.title(title)
     plt.grid(True, alpha=0.3, axis='x')
     plt.tight_layout()
-    plt.show()
+    rendering.show()
 
 def plot_correlation_with_target(df: pd.DataFrame, target_column: str = 'Credit_Limit'):
     """Визуализация корреляции признаков с целевой переменной."""
@@ -67,8 +150,8 @@ def plot_correlation_with_target(df: pd.DataFrame, target_column: str = 'Credit_
         print("Недостаточно числовых колонок для анализа корреляции")
         return
     
-    # Вычисляем корреляцию с целевой переменной
-    correlations = df[numeric_columns].corr()[target_column].drop(target_column)
+    # Вычисляем корреляцию с целевой переменной (без полной матрицы корреляций)
+    correlations = data_processing.correlation_with_target(df[numeric_columns], target_column)
     correlations = correlations.sort_values(key=abs, ascending=False)
     
     # Берем топ-15 признаков по абсолютной корреляции
@@ -96,7 +179,7 @@ def plot_correlation_with_target(df: pd.DataFrame, target_column: str = 'Credit_
              color='red', fontweight='bold', fontsize=10, verticalalignment='top')
     
     plt.tight_layout()
-    plt.show()
+    rendering.show()
     
     # Выводим численные значения корреляции
     print("\nТоп-10 признаков по корреляции с Credit_Limit:")
@@ -0,0 +1,162 @@
+"""Потоковая загрузка CSV в типизированные таблицы SQLite.
+
+Файлы разбираются модулем csv чанками по chunksize строк; на нескольких ядрах каждый
+файл - в отдельном процессе, одновременно друг с другом и со вставкой в базу. Чанки
+передаются через очередь ограниченного размера: в памяти одновременно не больше
+нескольких чанков на файл, независимо от размера выгрузки.
+Каждая таблица записывается через executemany в одной транзакции.
+"""
+import csv
+import multiprocessing
+import os
+import time
+from datetime import datetime
+
+# Колонки дат приводятся к ISO 8601 'YYYY-MM-DD HH:MM:SS' (формат функций дат SQLite)
+DATE_COLUMNS = {'datetime', 'datetime2', 'monthyear', 'date_of_birth'}
+# Форматы дат, отличные от ISO (новые выгрузки Austin Open Data)
+DATE_FORMATS = ['%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%Y-%m-%d', '%b %Y']
+# Типы известных колонок; остальные колонки CSV создаются как TEXT.
+# Строки с пустой NOT NULL колонкой не вставляются, а пропускаются с отчетом
+COLUMN_TYPES = {'animal_id': 'TEXT NOT NULL'}
+
+def read_header(path: str) -> list:
+    with open(path, encoding='utf-8', newline='') as f:
+        return next(csv.reader(f))
+
+def normalize_date(value: str):
+    """Дата в 'YYYY-MM-DD HH:MM:SS'; ISO 8601 только обрезается, другие форматы разбираются.
+
+    Пустое или неразобранное значение - None.
+    """
+    if not value:
+        return None
+    if len(value) >= 19 and value[4] == '-' and value[10] in 'T ':
+        return f'{value[:10]} {value[11:19]}'
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    return None
+
+def date_indexes(columns: list) -> list:
+    return [i for i, column in enumerate(columns) if column in DATE_COLUMNS]
+
+def required_indexes(columns: list) -> list:
+    """Позиции колонок, объявленных NOT NULL."""
+    return [i for i, column in enumerate(columns) if 'NOT NULL' in COLUMN_TYPES.get(column, '')]
+
+def is_valid_row(row: list, width: int, required: list) -> bool:
+    """Строка с числом полей, как в заголовке, и заполненными NOT NULL колонками."""
+    return len(row) == width and all(row[i] for i in required)
+
+def convert_row(row: list, dates: list) -> tuple:
+    """Строка csv.reader -> кортеж для вставки: даты в ISO 8601, пустые значения - None."""
+    for i in dates:
+        row[i] = normalize_date(row[i])
+    return tuple([value if value else None for value in row])
+
+def iter_chunks(path: str, chunksize: int = 50_000):
+    """Строки CSV (кроме заголовка) чанками - списками кортежей для executemany.
+
+    Пустые значения - None, колонки дат приведены к ISO 8601. Некорректные строки
+    (другое число полей, пустой animal_id) пропускаются: одна такая строка не должна
+    отменять загрузку всего файла; их число печатается в конце.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        dates = date_indexes(header)
+        required = required_indexes(header)
+        chunk = []
+        skipped = 0
+        for row in reader:
+            if not is_valid_row(row, len(header), required):
+                skipped += 1
+                continue
+            chunk.append(convert_row(row, dates))
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    if skipped:
+        print(f"   {os.path.basename(path)}: пропущено некорректных строк: {skipped}")
+
+def _parse_worker(path: str, chunksize: int, out_queue):
+    """Разбор файла в очередь; в конце - None, при ошибке - текст ошибки."""
+    try:
+        for chunk in iter_chunks(path, chunksize):
+            out_queue.put(chunk)
+        out_queue.put(None)
+    except Exception as e:
+        out_queue.put(f"{path}: {e}")
+
+def start_parsing(path: str, chunksize: int = 50_000, max_chunks: int = 2):
+    """Запуск разбора файла в отдельном процессе; возвращает (процесс, очередь чанков)."""
+    out_queue = multiprocessing.Queue(maxsize=max_chunks)
+    process = multiprocessing.Process(target=_parse_worker, args=(path, chunksize, out_queue), daemon=True)
+    process.start()
+    return process, out_queue
+
+def create_table_sql(table: str, columns: list) -> str:
+    definitions = ', '.join(f'"{column}" {COLUMN_TYPES.get(column, "TEXT")}' for column in columns)
+    return f'CREATE TABLE {table} ({definitions})'
+
+def insert_chunks(conn, table: str, columns: list, chunks, verbose: bool = True) -> int:
+    """Вставка чанков (итератор или очередь) в таблицу одной транзакцией.
+
+    Прогресс и скорость (строк/с) печатаются после каждого чанка.
+    """
+    if hasattr(chunks, 'get'):
+        chunks = iter(chunks.get, None)
+    placeholders = ', '.join('?' * len(columns))
+    names = ', '.join(f'"{column}"' for column in columns)
+    sql = f'INSERT INTO {table} ({names}) VALUES ({placeholders})'
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                raise RuntimeError(f"Ошибка разбора {chunk}")
+            conn.executemany(sql, chunk)
+            rows += len(chunk)
+            if verbose:
+                print(f"   {table}: {rows} строк, {rows / (time.perf_counter() - start):,.0f} строк/с")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+def load_csv(conn, sources: dict, chunksize: int = 50_000, parallel: bool = None) -> dict:
+    """Загрузка CSV {таблица: путь} в новые таблицы с теми же колонками.
+
+    parallel=True - все файлы разбираются одновременно в отдельных процессах, таблицы
+    записываются по очереди (в SQLite один писатель). По умолчанию включено, если
+    процессоров больше одного: на одном ядре передача чанков между процессами только
+    добавляет работу, и файлы разбираются по чанкам в текущем процессе.
+    Возвращает число загруженных строк по таблицам.
+    """
+    if parallel is None:
+        parallel = (os.cpu_count() or 1) > 1
+    columns = {table: read_header(path) for table, path in sources.items()}
+    workers = {table: start_parsing(path, chunksize) for table, path in sources.items()} if parallel else {}
+    counts = {}
+    try:
+        for table, path in sources.items():
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+            conn.execute(create_table_sql(table, columns[table]))
+            start = time.perf_counter()
+            chunks = workers[table][1] if parallel else iter_chunks(path, chunksize)
+            counts[table] = insert_chunks(conn, table, columns[table], chunks)
+            elapsed = time.perf_counter() - start
+            print(f"{table}: загружено {counts[table]} строк за {elapsed:.2f} с "
+                  f"({counts[table] / max(elapsed, 1e-9):,.0f} строк/с)")
+    finally:
+        for process, _ in workers.values():
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+    return counts
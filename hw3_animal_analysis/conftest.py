@@ -0,0 +1,91 @@
+"""Общие фикстуры тестов: база приюта, собранная шагами ETL из небольших CSV."""
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import connection
+import database
+
+INTAKE_COLUMNS = ['animal_id', 'name', 'datetime', 'datetime2', 'found_location', 'intake_type',
+                  'intake_condition', 'animal_type', 'sex_upon_intake', 'age_upon_intake', 'breed', 'color']
+OUTCOME_COLUMNS = ['age_upon_outcome', 'animal_id', 'animal_type', 'breed', 'color', 'date_of_birth',
+                   'datetime', 'monthyear', 'name', 'outcome_subtype', 'outcome_type', 'sex_upon_outcome']
+
+def intake(animal_id: str, when: str, **values) -> dict:
+    """Строка aac_intakes.csv; when - 'YYYY-MM-DD HH:MM'."""
+    moment = pd.Timestamp(when).strftime('%Y-%m-%dT%H:%M:%S.000')
+    row = {
+        'animal_id': animal_id, 'name': 'Max', 'datetime': moment, 'datetime2': moment,
+        'found_location': 'Austin (TX)', 'intake_type': 'Stray', 'intake_condition': 'Normal',
+        'animal_type': 'Dog', 'sex_upon_intake': 'Neutered Male', 'age_upon_intake': '2 years',
+        'breed': 'Pit Bull Mix', 'color': 'Brown',
+    }
+    row.update(values)
+    return row
+
+def outcome(animal_id: str, when: str, **values) -> dict:
+    """Строка aac_outcomes.csv; when - 'YYYY-MM-DD HH:MM'."""
+    moment = pd.Timestamp(when)
+    row = {
+        'age_upon_outcome': '2 years', 'animal_id': animal_id, 'animal_type': 'Dog', 'breed': 'Pit Bull Mix',
+        'color': 'Brown', 'date_of_birth': '2012-01-01T00:00:00', 'datetime': moment.strftime('%Y-%m-%dT%H:%M:%S.000'),
+        'monthyear': moment.strftime('%Y-%m-%dT%H:%M:%S'), 'name': 'Max', 'outcome_subtype': '',
+        'outcome_type': 'Adoption', 'sex_upon_outcome': 'Neutered Male',
+    }
+    row.update(values)
+    return row
+
+def random_rows(animals: int = 300, seed: int = 0) -> tuple:
+    """Поступления и выходы животных с 1-3 пребываниями; часть пребываний без выхода."""
+    rng = np.random.default_rng(seed)
+    intakes, outcomes = [], []
+    for i in range(animals):
+        animal_id = f'A{700000 + i}'
+        values = {
+            'animal_type': str(rng.choice(['Dog', 'Cat', 'Other', 'Bird'])),
+            'breed': str(rng.choice(['Pit Bull Mix', 'Domestic Shorthair Mix', 'Bat Mix'])),
+            'color': str(rng.choice(['Black/White', 'Brown', 'Tabby'])),
+        }
+        moment = pd.Timestamp('2014-01-01') + pd.Timedelta(minutes=int(rng.integers(0, 60 * 24 * 365 * 3)))
+        for _ in range(int(rng.choice([1, 1, 2, 3]))):
+            intakes.append(intake(animal_id, str(moment), intake_type=str(rng.choice(['Stray', 'Owner Surrender'])),
+                                  **values))
+            moment += pd.Timedelta(hours=int(rng.integers(1, 24 * 60)))
+            if rng.random() < 0.9:
+                outcomes.append(outcome(animal_id, str(moment),
+                                        outcome_type=str(rng.choice(['Adoption', 'Transfer'])), **values))
+                moment += pd.Timedelta(hours=int(rng.integers(1, 24 * 300)))
+    return intakes, outcomes
+
+def write_csv(path, columns: list, rows: list):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_sources(directory, intakes: list, outcomes: list):
+    """CSV источников database.RAW_SOURCES в каталоге directory."""
+    (directory / 'data').mkdir(exist_ok=True)
+    write_csv(directory / database.RAW_SOURCES['raw_intake'], INTAKE_COLUMNS, intakes)
+    write_csv(directory / database.RAW_SOURCES['raw_outcome'], OUTCOME_COLUMNS, outcomes)
+
+@pytest.fixture
+def build_database(tmp_path, monkeypatch):
+    """Функция (intakes, outcomes) -> соединение 'read' с базой, собранной шагами ETL_STEPS.
+
+    name - файл базы в tmp_path (несколько баз в одном тесте).
+    """
+    original_path = connection.database_path()
+    monkeypatch.chdir(tmp_path)
+
+    def build(intakes: list, outcomes: list, name: str = 'animal_shelter.db'):
+        write_sources(tmp_path, intakes, outcomes)
+        connection.configure(str(tmp_path / name))
+        for step in database.ETL_STEPS:
+            step()
+        return connection.get_connection('read')
+
+    yield build
+    connection.configure(original_path)
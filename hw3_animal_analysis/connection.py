@@ -0,0 +1,108 @@
+"""Общее подключение к базе приюта с настройками SQLite под этап работы.
+
+Все функции database.py и visualization.py берут соединение через get_connection(phase):
+- 'load' - массовая запись (create_raw_tables, create_normalized_tables): WAL без fsync,
+  большой кэш страниц, временные данные в памяти; сбой посреди сборки лечится пересборкой;
+- 'refresh' - запись прироста в долгоживущую базу (incremental.refresh_database): как 'load',
+  но synchronous=NORMAL - сбой не должен повредить уже накопленную базу;
+- 'read' - аналитика: mmap файла базы, query_only, после загрузки WAL сливается в базу.
+
+Путь к базе задается переменной окружения ANIMAL_SHELTER_DB или configure(path=...);
+configure(tuned=False) оставляет настройки SQLite по умолчанию (для database.compare_etl_times).
+"""
+import os
+import sqlite3
+
+DEFAULT_DB_PATH = 'animal_shelter.db'
+
+# Значения, которые меняются между этапами, заданы в каждом этапе явно
+PHASE_PRAGMAS = {
+    'load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,  # 256 МБ (отрицательное значение - в КБ)
+        'temp_store': 'MEMORY',
+        'mmap_size': 0,
+        'query_only': 'OFF',
+    },
+    'refresh': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -262144,
+        'temp_store': 'MEMORY',
+        'mmap_size': 0,
+        'query_only': 'OFF',
+    },
+    'read': {
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,  # 64 МБ
+        'temp_store': 'MEMORY',
+        'mmap_size': 1 << 30,
+        'query_only': 'ON',
+    },
+}
+
+class ConnectionManager:
+    """Одно соединение на процесс; PRAGMA переключаются при смене этапа.
+
+    После fork (ProcessPoolExecutor в rendering.render_parallel) дочерний процесс
+    открывает свое соединение, а не использует унаследованное.
+    """
+
+    def __init__(self, path: str = None, tuned: bool = True):
+        self.path = path or os.environ.get('ANIMAL_SHELTER_DB') or DEFAULT_DB_PATH
+        self.tuned = tuned
+        self.phase = None
+        self._conn = None
+        self._pid = None
+
+    def get_connection(self, phase: str = 'read') -> sqlite3.Connection:
+        if phase not in PHASE_PRAGMAS:
+            raise ValueError(f"Неизвестный этап: {phase}")
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path)
+            self._pid = os.getpid()
+            self.phase = None
+        if phase != self.phase and self.tuned:
+            self._apply(phase)
+        return self._conn
+
+    def _apply(self, phase: str):
+        conn = self._conn
+        if conn.in_transaction:
+            # Молча откатывать нельзя - пропали бы записи этапа; функции с ошибкой откатывают сами
+            raise RuntimeError(f"Смена этапа {self.phase} -> {phase} при незавершенной транзакции: "
+                               "выполните commit() или rollback()")
+        if self.phase in ('load', 'refresh'):
+            # Сливаем WAL в файл базы, чтобы чтение не проходило по журналу загрузки
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        for name, value in PHASE_PRAGMAS[phase].items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        self.phase = phase
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self.phase = None
+
+    def configure(self, path: str = None, tuned: bool = True):
+        self.close()
+        self.path = path or self.path
+        self.tuned = tuned
+
+manager = ConnectionManager()
+
+def get_connection(phase: str = 'read') -> sqlite3.Connection:
+    """Общее соединение с базой, настроенное под этап ('load', 'refresh' или 'read')."""
+    return manager.get_connection(phase)
+
+def close_connection():
+    manager.close()
+
+def configure(path: str = None, tuned: bool = True):
+    """Смена файла базы и/или отключение настроек этапов (текущее соединение закрывается)."""
+    manager.configure(path, tuned)
+
+def database_path() -> str:
+    return manager.path
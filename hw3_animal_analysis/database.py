@@ -1,12 +1,178 @@
-import sqlite3
+import connection
+import bulk_loader
+import indexes
 import pandas as pd
+import contextlib
+import io
 import os
+import shutil
+import tempfile
+import time
+
+# Уникальные животные - таблица с первичным ключом animal_id: одна строка на животное,
+# атрибуты из последнего выхода, если есть, иначе из последнего поступления.
+# Таблицы-источники подставляются: raw_* при полной сборке, выборки по затронутым
+# животным при инкрементальном обновлении (INSERT OR REPLACE заменяет их строки).
+UNIQUE_ANIMALS_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS unique_animals (
+            animal_id TEXT PRIMARY KEY,
+            name TEXT,
+            animal_type TEXT,
+            breed TEXT,
+            color TEXT
+        )
+'''
+
+UNIQUE_ANIMALS_FILL_SQL = '''
+        INSERT OR REPLACE INTO unique_animals (animal_id, name, animal_type, breed, color)
+        WITH latest_intake AS (
+            SELECT animal_id, name, animal_type, breed, color
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY animal_id ORDER BY datetime DESC) AS rn
+                FROM {intake}
+            )
+            WHERE rn = 1
+        ),
+        latest_outcome AS (
+            SELECT animal_id, name, animal_type, breed, color
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY animal_id ORDER BY datetime DESC) AS rn
+                FROM {outcome}
+            )
+            WHERE rn = 1
+        ),
+        ids AS (
+            SELECT animal_id FROM latest_intake
+            UNION
+            SELECT animal_id FROM latest_outcome
+        )
+        SELECT
+            ids.animal_id,
+            COALESCE(out.name, intake.name) AS name,
+            COALESCE(out.animal_type, intake.animal_type) AS animal_type,
+            COALESCE(out.breed, intake.breed) AS breed,
+            COALESCE(out.color, intake.color) AS color
+        FROM
+            ids
+        LEFT JOIN
+            latest_intake intake ON intake.animal_id = ids.animal_id
+        LEFT JOIN
+            latest_outcome out ON out.animal_id = ids.animal_id
+'''
+
+ANIMALS_FILL_SQL = '''
+        INSERT OR REPLACE INTO animals (animal_id, name, animal_type_id, breed_id, color_id)
+        SELECT
+            ua.animal_id,
+            ua.name,
+            at.type_id,
+            b.breed_id,
+            c.color_id
+        FROM {source} ua
+        JOIN animal_types at ON ua.animal_type = at.animal_type
+        JOIN breeds b ON ua.breed = b.breed_name
+        JOIN colors c ON ua.color = c.color_name
+'''
+
+# Пребывания: события поступления (kind = 0) и выхода (kind = 1) одного животного
+# сливаются в один поток по времени; выход относится к предыдущему событию, если это
+# поступление (as-of соединение за одну сортировку, O(n log n)). Сохраняются все выходы,
+# у выхода без предшествующего поступления days_in_shelter = NULL.
+STAYS_SQL = '''
+        WITH events AS (
+            SELECT animal_id, datetime, 0 AS kind, NULL AS outcome_type, NULL AS outcome_subtype
+            FROM {intake}
+            WHERE datetime IS NOT NULL
+            UNION ALL
+            SELECT animal_id, datetime, 1 AS kind, outcome_type, outcome_subtype
+            FROM {outcome}
+            WHERE datetime IS NOT NULL
+        ),
+        stays AS (
+            SELECT
+                events.*,
+                LAG(kind) OVER by_time AS previous_kind,
+                LAG(datetime) OVER by_time AS previous_datetime
+            FROM
+                events
+            WINDOW by_time AS (PARTITION BY animal_id ORDER BY datetime, kind)
+        )
+        SELECT
+            animal_id,
+            datetime,
+            outcome_type,
+            outcome_subtype,
+            CASE
+                WHEN previous_kind = 0 THEN julianday(datetime) - julianday(previous_datetime)
+            END AS days_in_shelter
+        FROM
+            stays
+        WHERE
+            kind = 1
+'''
+
+OUTCOME_FILL_SQL = '''
+        INSERT INTO outcome (animal_id, outcome_date, outcome_type, outcome_subtype, days_in_shelter)
+''' + STAYS_SQL
+
+# Прежнее сопоставление (каждый выход со всеми поступлениями животного, первый выход
+# с первым поступлением) - только для сравнения в compare_outcome_fill
+PAIRWISE_STAYS_SQL = '''
+        WITH intake_dates AS (
+            SELECT
+                animal_id,
+                datetime,
+                ROW_NUMBER() OVER (PARTITION BY animal_id ORDER BY datetime) AS rn
+            FROM
+                {intake}
+        ),
+        outcome_dates AS (
+            SELECT
+                out.animal_id,
+                out.datetime AS outcome_datetime,
+                out.outcome_type,
+                out.outcome_subtype,
+                intake.datetime AS intake_datetime,
+                ROW_NUMBER() OVER (PARTITION BY out.animal_id ORDER BY out.datetime) AS rn
+            FROM
+                {outcome} out
+            LEFT JOIN intake_dates intake ON out.animal_id = intake.animal_id
+            WHERE intake.datetime IS NOT NULL
+        )
+        SELECT
+            animal_id,
+            outcome_datetime,
+            outcome_type,
+            outcome_subtype,
+            julianday(outcome_datetime) - julianday(intake_datetime) AS days_in_shelter
+        FROM
+            outcome_dates
+        WHERE
+            rn = 1
+'''
+
+# Календарные колонки даты - вычисляемые (STORED) колонки, заполняются при вставке строки,
+# в том числе при инкрементальном обновлении. Аналитика группирует по ним и не разбирает
+# текст даты в каждой строке. Сезон: 0 - зима (12, 1, 2), 1 - весна, 2 - лето, 3 - осень.
+def calendar_columns(date_column: str, prefix: str) -> str:
+    return f'''
+            {prefix}_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', {date_column}) AS INTEGER)) STORED,
+            {prefix}_year INTEGER GENERATED ALWAYS AS (CAST(strftime('%Y', {date_column}) AS INTEGER)) STORED,
+            {prefix}_month INTEGER GENERATED ALWAYS AS (CAST(strftime('%m', {date_column}) AS INTEGER)) STORED,
+            {prefix}_hour INTEGER GENERATED ALWAYS AS (CAST(strftime('%H', {date_column}) AS INTEGER)) STORED,
+            {prefix}_season INTEGER GENERATED ALWAYS AS ({prefix}_month % 12 / 3) STORED,'''
 
 def delete_existing_database():
     """Удаление существующей базы данных, если она есть"""
     print("Проверяем существующую базу данных...")
-    if os.path.exists('animal_shelter.db'):
-        os.remove('animal_shelter.db')
+    connection.close_connection()
+    path = connection.database_path()
+    if os.path.exists(path):
+        os.remove(path)
+        # Файлы журнала WAL
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
         print("Существующая база данных удалена")
     else:
         print("База данных не существует, создаем новую")
@@ -26,39 +192,26 @@ def print_table_sample(conn, table_name, limit=20):
     except Exception as e:
         print(f"Ошибка при чтении таблицы {table_name}: {e}")
 
-def print_view_sample(conn, view_name, limit=20):
-    """Вывод sample данных из view"""
-    print(f"\nСодержимое view {view_name} (первые {limit} записей):")
-    print("-" * 60)
-    try:
-        query = f"SELECT * FROM {view_name} LIMIT {limit}"
-        df = pd.read_sql_query(query, conn)
-        if len(df) > 0:
-            print(df.to_string(index=False))
-            print(f"Всего записей в представлении {view_name}: {pd.read_sql_query(f'SELECT COUNT(*) FROM {view_name}', conn).iloc[0,0]}")
-        else:
-            print("Представление пустое")
-    except Exception as e:
-        print(f"Ошибка при чтении view {view_name}: {e}")
+RAW_SOURCES = {
+    'raw_intake': 'data/aac_intakes.csv',
+    'raw_outcome': 'data/aac_outcomes.csv',
+}
+
+def create_raw_tables(chunksize: int = 50_000):
+    """Создание сырых таблиц - копий CSV файлов
 
-def create_raw_tables():
-    """Создание сырых таблиц - копий CSV файлов"""
+    Файлы разбираются параллельно чанками по chunksize строк и вставляются в
+    таблицы с объявленными колонками (даты - в ISO 8601), одна транзакция на таблицу.
+    """
     print("\nЗагружаем CSV файлы в сырые таблицы...")
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('load')
 
     try:
-        # Загрузка данных в сырые таблицы
-        print("Загружаем aac_intakes.csv...")
-        intake_df = pd.read_csv('data/aac_intakes.csv')
-        print("Загружаем aac_outcomes.csv...")
-        outcome_df = pd.read_csv('data/aac_outcomes.csv')
-
-        # Создаем сырые таблицы
-        print("Сохраняем raw_intake...")
-        intake_df.to_sql('raw_intake', conn, if_exists='replace', index=False)
-        print("Сохраняем raw_outcome...")
-        outcome_df.to_sql('raw_outcome', conn, if_exists='replace', index=False)
+        print("Загружаем aac_intakes.csv и aac_outcomes.csv...")
+        bulk_loader.load_csv(conn, RAW_SOURCES, chunksize=chunksize)
+        # Индексы по animal_id - после загрузки, для unique_animals и расчета days_in_shelter
+        indexes.create_indexes(conn, ['raw_intake', 'raw_outcome'])
 
         print("Сырые таблицы созданы успешно")
         print()
@@ -67,75 +220,60 @@ def create_raw_tables():
         print_table_sample(conn, 'raw_outcome')
 
     except Exception as e:
+        conn.rollback()
         print(f"Ошибка при создании сырых таблиц: {e}")
         raise
-    finally:
-        conn.close()
 
 def create_temp_views():
-    """Создание временных представлений для анализа"""
-    print("\nСоздаем временные представления для анализа...")
+    """Создание таблицы unique_animals для анализа (материализованная, с первичным ключом)"""
+    print("\nСоздаем таблицу unique_animals для анализа...")
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('load')
     cursor = conn.cursor()
 
     try:
-        # Временное представление для уникальных животных
-        print("Создаем представление unique_animals...")
-        print("Выбираем уникальные animal_id из raw_intake и raw_outcome и к ним присоединяем данные о name, animal_type, breed, color из raw_outcome, если есть, иначе - из raw_intake")
-        cursor.execute('''
-        CREATE VIEW IF NOT EXISTS unique_animals AS
-        SELECT
-            intake.animal_id,
-            COALESCE(out.name, intake.name) AS name,
-            COALESCE(out.animal_type, intake.animal_type) AS animal_type,
-            COALESCE(out.breed, intake.breed) AS breed,
-            COALESCE(out.color, intake.color) AS color
-        FROM
-            raw_intake intake
-        LEFT JOIN
-            raw_outcome out ON intake.animal_id = out.animal_id
-        UNION
-        SELECT
-            out.animal_id,
-            out.name,
-            out.animal_type,
-            out.breed,
-            out.color
-        FROM
-            raw_outcome out
-        LEFT JOIN
-            raw_intake intake ON out.animal_id = intake.animal_id
-        WHERE
-            intake.animal_id IS NULL
-        ''')
+        # Уникальные животные - таблица вместо представления: union сырых таблиц считается один раз
+        print("Создаем таблицу unique_animals...")
+        print("Выбираем уникальные animal_id из raw_intake и raw_outcome и к ним присоединяем данные о name, animal_type, breed, color из последнего raw_outcome, если есть, иначе - из последнего raw_intake")
+        cursor.execute('DROP VIEW IF EXISTS unique_animals')
+        cursor.execute(UNIQUE_ANIMALS_TABLE_SQL)
+        cursor.execute(UNIQUE_ANIMALS_FILL_SQL.format(intake='raw_intake', outcome='raw_outcome'))
+        print(f"   Добавлено животных: {cursor.rowcount}")
 
         conn.commit()
-        print("Временное представленияе создано успешно")
+        print("Таблица unique_animals создана успешно")
 
         print()
-        print_view_sample(conn, 'unique_animals')
+        print_table_sample(conn, 'unique_animals')
 
     except Exception as e:
-        print(f"Ошибка при создании временных представлений: {e}")
+        conn.rollback()
+        print(f"Ошибка при создании unique_animals: {e}")
         raise
-    finally:
-        conn.close()
 
 def analyze_raw_data():
     """Анализ сырых данных перед обработкой"""
-    print("\nАнализируем данные в представлениях")
+    print("\nАнализируем данные в unique_animals")
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('read')
 
     try:
         print("\nПроверяем, что у нас не размножились записи при формировании unique_animals")
-        unique_animal_id = pd.read_sql_query('WITH s1 as (SELECT animal_id FROM raw_outcome UNION SELECT animal_id FROM raw_intake) SELECT count(animal_id) from s1', conn).iloc[0,0]
-        unique_animals_records_count = pd.read_sql_query(f'SELECT COUNT(*) FROM unique_animals', conn).iloc[0,0]
+        # animal_id - первичный ключ unique_animals, сырые таблицы проиндексированы по animal_id:
+        # оба подсчета читают только индексы
+        unique_animal_id = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT animal_id FROM raw_intake
+            UNION
+            SELECT animal_id FROM raw_outcome
+        )
+        ''').fetchone()[0]
+        unique_animals_records_count = conn.execute('SELECT COUNT(*) FROM unique_animals').fetchone()[0]
         if unique_animal_id == unique_animals_records_count:
             print("Всего уникальных animal_id в raw_intake и raw_outcome:", unique_animal_id, "что равно количеству записей в unique_animals")
         else:
-            ("Что-то пошло не так. Всего уникальных animal_id в raw_intake и raw_outcome: ", unique_animal_id, "что не равно количеству записей в unique_animals")
+            print("Что-то пошло не так. Всего уникальных animal_id в raw_intake и raw_outcome:", unique_animal_id,
+                  "что не равно количеству записей в unique_animals:", unique_animals_records_count)
 
         print("\nМожно сделать еще много разных представлений и запросов, но в DBeaver это делать удобнее\n")
 
@@ -143,14 +281,12 @@ def analyze_raw_data():
     except Exception as e:
         print(f"Ошибка при анализе данных: {e}")
         raise
-    finally:
-        conn.close()
 
 def create_normalized_tables():
     """Создание нормализованных таблиц со справочниками"""
     print("\nСоздаем нормализованную структуру...")
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('load')
     cursor = conn.cursor()
 
     try:
@@ -228,19 +364,7 @@ def create_normalized_tables():
 
         # Заполняем таблицу животных
         print("Заполняем таблицу animals...")
-        cursor.execute('''
-        INSERT OR REPLACE INTO animals (animal_id, name, animal_type_id, breed_id, color_id)
-        SELECT
-            ua.animal_id,
-            ua.name,
-            at.type_id,
-            b.breed_id,
-            c.color_id
-        FROM unique_animals ua
-        JOIN animal_types at ON ua.animal_type = at.animal_type
-        JOIN breeds b ON ua.breed = b.breed_name
-        JOIN colors c ON ua.color = c.color_name
-        ''')
+        cursor.execute(ANIMALS_FILL_SQL.format(source='unique_animals'))
         print(f"   Добавлено животных: {cursor.rowcount}")
 
         # 5. Создаем таблицу поступлений
@@ -252,7 +376,7 @@ def create_normalized_tables():
             intake_date TEXT NOT NULL,
             intake_type TEXT,
             intake_condition TEXT,
-            found_location TEXT,
+            found_location TEXT,''' + calendar_columns('intake_date', 'intake') + '''
             FOREIGN KEY (animal_id) REFERENCES animals(animal_id)
         )
         ''')
@@ -278,71 +402,37 @@ def create_normalized_tables():
             outcome_date TEXT NOT NULL,
             outcome_type TEXT,
             outcome_subtype TEXT,
-            days_in_shelter INTEGER,
+            days_in_shelter INTEGER,''' + calendar_columns('outcome_date', 'outcome') + '''
             FOREIGN KEY (animal_id) REFERENCES animals(animal_id)
         )
         ''')
 
-        cursor.execute('''
-        INSERT INTO outcome (animal_id, outcome_date, outcome_type, outcome_subtype, days_in_shelter)
-        WITH intake_dates AS (
-            SELECT
-                animal_id,
-                datetime,
-                ROW_NUMBER() OVER (PARTITION BY animal_id ORDER BY datetime) AS rn
-            FROM
-                raw_intake
-        ),
-        outcome_dates AS (
-            SELECT
-                out.animal_id,
-                out.datetime AS outcome_datetime,
-                out.outcome_type,
-                out.outcome_subtype,
-                intake.datetime AS intake_datetime,
-                ROW_NUMBER() OVER (PARTITION BY out.animal_id ORDER BY out.datetime) AS rn
-            FROM
-                raw_outcome out
-            LEFT JOIN intake_dates intake ON out.animal_id = intake.animal_id
-            WHERE intake.datetime IS NOT NULL
-        )
-        SELECT
-            animal_id,
-            outcome_datetime,
-            outcome_type,
-            outcome_subtype,
-            CASE
-                WHEN intake_datetime IS NOT NULL AND outcome_datetime IS NOT NULL THEN
-                    julianday(outcome_datetime) - julianday(intake_datetime)
-                ELSE
-                    NULL
-            END AS days_in_shelter
-        FROM
-            outcome_dates
-        WHERE
-            rn = 1
-        ''')
+        cursor.execute(OUTCOME_FILL_SQL.format(intake='raw_intake', outcome='raw_outcome'))
         print(f"   Добавлено выходов: {cursor.rowcount}")
 
         conn.commit()
+
+        # Индексы для аналитических запросов - после заполнения таблиц
+        indexes.create_indexes(conn, ['animals', 'intake', 'outcome'])
         print("Нормализованная структура создана успешно")
 
     except Exception as e:
+        conn.rollback()
         print(f"Ошибка при создании нормализованной структуры: {e}")
         raise
-    finally:
-        conn.close()
 
 def drop_temp_views():
     """Удаление временных представлений"""
     print("\nУдаляем временные представления...")
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('load')
     cursor = conn.cursor()
 
     try:
-        views = ['unique_animals']
-        for view in views:
+        # unique_animals - таблица, она остается для инкрементального обновления;
+        # удаляем только представления (например, из баз, собранных до ее появления)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'view'")
+        for (view,) in cursor.fetchall():
             cursor.execute(f"DROP VIEW IF EXISTS {view}")
             print(f"   Удалено представление: {view}")
 
@@ -350,20 +440,19 @@ def drop_temp_views():
         print("Временные представления удалены")
 
     except Exception as e:
+        conn.rollback()
         print(f"Ошибка при удалении представлений: {e}")
         raise
-    finally:
-        conn.close()
 
 def print_database_structure():
     """Вывод структуры базы данных и примеров данных"""
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('read')
     cursor = conn.cursor()
 
     try:
         # Получаем список всех таблиц
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")
         tables = cursor.fetchall()
 
         print("Таблицы в базе данных:")
@@ -390,13 +479,70 @@ def print_database_structure():
         print_table_sample(conn, 'outcome')
 
         print("""\nТаблицу outcome обогатили полем days_in_shelter, которое рассчитали как разницу между raw_outcome.datetime и raw_intake.datetime, связав по animal_id.
-             Учтено, что может быть несколько записей по одному animal_id в каждой из raw_outcome и raw_intake - берем ближайшую следующую raw_outcome.datetime для каждой raw_intake.datetime.
-             Также учтено, что может быть не заполнено какое-то из raw_outcome.datetime или raw_intake.datetime или оба - тогда days_in_shelter is null.
-             При оптимизации запроса использованы CTE (with) и оконная функция ROW_NUMBER()
+             Учтено, что может быть несколько записей по одному animal_id в каждой из raw_outcome и raw_intake - каждое пребывание (поступление и ближайший следующий выход) дает свою запись outcome.
+             Также учтено, что может быть не заполнено какое-то из raw_outcome.datetime или raw_intake.datetime или оба - выход без предшествующего поступления получает days_in_shelter is null.
+             Поступления и выходы животного сливаются в один упорядоченный поток, выход связывается с предыдущим событием оконной функцией LAG (одна сортировка вместо соединения всех выходов со всеми поступлениями)
              """)
 
     except Exception as e:
         print(f"Ошибка при выводе структуры: {e}")
         raise
+
+ETL_STEPS = [delete_existing_database, create_raw_tables, create_temp_views, analyze_raw_data,
+             create_normalized_tables, drop_temp_views]
+
+def compare_etl_times(repeats: int = 3) -> dict:
+    """Сравнение времени ETL с настройками SQLite по умолчанию и с настройками этапов.
+
+    Каждый прогон строит базу заново во временном каталоге; вывод шагов подавляется.
+    Возвращает лучшее время (с) для каждого режима.
+    """
+    original_path = connection.database_path()
+    work_dir = tempfile.mkdtemp()
+    results = {}
+    try:
+        for label, tuned in [('по умолчанию', False), ('настройки этапов', True)]:
+            connection.configure(os.path.join(work_dir, 'benchmark.db'), tuned=tuned)
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for step in ETL_STEPS:
+                        step()
+                times.append(time.perf_counter() - start)
+            results[label] = min(times)
     finally:
-        conn.close()
+        connection.configure(original_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("Время ETL (лучшее из", repeats, "прогонов):")
+    for label, seconds in results.items():
+        print(f"   {label:18s}: {seconds:.3f} с")
+    print(f"   Ускорение: {results['по умолчанию'] / results['настройки этапов']:.2f}x")
+    return results
+
+def compare_outcome_fill(repeats: int = 3) -> dict:
+    """Сравнение расчета days_in_shelter на текущей базе: as-of соединение и прежнее попарное.
+
+    Запросы только читают raw_intake и raw_outcome (без вставки в outcome).
+    Возвращает лучшее время (с), число выходов и число выходов с известным сроком.
+    """
+    conn = connection.get_connection('read')
+    queries = {
+        'as-of (LAG)': STAYS_SQL,
+        'попарное (LEFT JOIN)': PAIRWISE_STAYS_SQL,
+    }
+    results = {}
+    for label, sql in queries.items():
+        sql = f"SELECT COUNT(*), COUNT(days_in_shelter) FROM ({sql.format(intake='raw_intake', outcome='raw_outcome')})"
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows, stays = conn.execute(sql).fetchone()
+            times.append(time.perf_counter() - start)
+        results[label] = {'seconds': min(times), 'rows': rows, 'stays': stays}
+
+    print("Расчет days_in_shelter (лучшее из", repeats, "прогонов):")
+    for label, result in results.items():
+        print(f"   {label:22s}: {result['seconds']:.3f} с, выходов: {result['rows']}, с известным сроком: {result['stays']}")
+    return results
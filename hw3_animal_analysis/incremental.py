@@ -0,0 +1,221 @@
+"""Инкрементальное обновление базы приюта по водяным знакам источников.
+
+Выгрузка Austin только дополняется, поэтому для каждого CSV хранится водяной знак -
+последняя загруженная дата и хэши строк с этой датой (таблица etl_watermarks).
+refresh_database добавляет в raw_* только строки новее водяного знака, дополняет
+справочники и intake, а unique_animals, animals и outcome (days_in_shelter) пересчитывает только
+для затронутых animal_id. Работа с базой пропорциональна приросту, а не всей истории;
+сам CSV по-прежнему читается целиком (порядок строк в выгрузке не гарантирован).
+"""
+import csv
+import hashlib
+import os
+import time
+
+import bulk_loader
+import connection
+import database
+
+WATERMARK_COLUMN = 'datetime'
+
+# Справочник: (таблица, колонка справочника, колонка сырых таблиц)
+DIMENSIONS = [
+    ('animal_types', 'animal_type', 'animal_type'),
+    ('colors', 'color_name', 'color'),
+    ('breeds', 'breed_name', 'breed'),
+]
+
+def row_hash(row: tuple) -> str:
+    """Хэш строки в том виде, в каком она хранится в raw_* (после нормализации дат)."""
+    return hashlib.sha1('\x1f'.join('' if value is None else str(value) for value in row).encode()).hexdigest()
+
+def _create_state_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS etl_watermarks (
+        source TEXT NOT NULL,
+        last_datetime TEXT NOT NULL,
+        row_hash TEXT NOT NULL,
+        PRIMARY KEY (source, row_hash)
+    )
+    ''')
+
+def read_watermark(conn, table: str) -> tuple:
+    """(последняя дата, множество хэшей строк с этой датой) или (None, пустое множество)."""
+    rows = conn.execute('SELECT last_datetime, row_hash FROM etl_watermarks WHERE source = ?', (table,)).fetchall()
+    if not rows:
+        return None, set()
+    return rows[0][0], {row[1] for row in rows}
+
+def write_watermark(conn, table: str, last_datetime: str, hashes: set):
+    conn.execute('DELETE FROM etl_watermarks WHERE source = ?', (table,))
+    conn.executemany('INSERT INTO etl_watermarks (source, last_datetime, row_hash) VALUES (?, ?, ?)',
+                     [(table, last_datetime, h) for h in hashes])
+
+def record_watermarks(conn):
+    """Водяные знаки по текущему содержимому raw_* (после полной сборки)."""
+    _create_state_table(conn)
+    for table in database.RAW_SOURCES:
+        last = conn.execute(f'SELECT MAX({WATERMARK_COLUMN}) FROM {table}').fetchone()[0]
+        if last is None:
+            continue
+        rows = conn.execute(f'SELECT * FROM {table} WHERE {WATERMARK_COLUMN} = ?', (last,)).fetchall()
+        write_watermark(conn, table, last, {row_hash(row) for row in rows})
+    conn.commit()
+
+def new_rows(path: str, watermark: tuple, chunksize: int = 50_000):
+    """Чанки строк CSV новее водяного знака и новый водяной знак (заполняется по ходу чтения).
+
+    Строка новая, если ее дата больше последней загруженной или равна ей, но хэша
+    строки нет среди загруженных. У старых строк приводится к ISO только дата, строка
+    целиком не разбирается. Строки без даты пропускаются (их нельзя упорядочить
+    относительно водяного знака; intake_date обязателен и при полной сборке), как и
+    некорректные строки, которые пропускает bulk_loader.iter_chunks.
+    """
+    last, seen = watermark
+    state = {'last': last, 'hashes': set(seen), 'skipped': 0}
+
+    def chunks():
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            date_index = header.index(WATERMARK_COLUMN)
+            dates = bulk_loader.date_indexes(header)
+            required = bulk_loader.required_indexes(header)
+            selected = []
+            for raw in reader:
+                if not bulk_loader.is_valid_row(raw, len(header), required):
+                    state['skipped'] += 1
+                    continue
+                value = bulk_loader.normalize_date(raw[date_index])
+                if value is None:
+                    state['skipped'] += 1
+                    continue
+                if last is not None and value < last:
+                    continue
+                row = bulk_loader.convert_row(raw, dates)
+                if value == last and row_hash(row) in seen:
+                    continue
+                selected.append(row)
+                if state['last'] is None or value > state['last']:
+                    state['last'], state['hashes'] = value, {row_hash(row)}
+                elif value == state['last']:
+                    state['hashes'].add(row_hash(row))
+                if len(selected) >= chunksize:
+                    yield selected
+                    selected = []
+            if selected:
+                yield selected
+
+    return chunks(), state
+
+def _insert_new_rows(conn, table: str, path: str, chunksize: int) -> tuple:
+    """Добавление новых строк в raw-таблицу; возвращает (rowid до вставки, число строк)."""
+    before = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0]
+    chunks, state = new_rows(path, read_watermark(conn, table), chunksize)
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    header = bulk_loader.read_header(path)
+    if header != columns:
+        raise ValueError(f"Колонки {path} не совпадают с таблицей {table}: {header}")
+    # Вставка без отдельного commit: вся загрузка прироста - одна транзакция
+    placeholders = ', '.join('?' * len(columns))
+    count = 0
+    for chunk in chunks:
+        conn.executemany(f'INSERT INTO {table} VALUES ({placeholders})', chunk)
+        count += len(chunk)
+    if state['last'] is not None:
+        write_watermark(conn, table, state['last'], state['hashes'])
+    if state['skipped']:
+        print(f"   {table}: пропущено строк без даты или некорректных: {state['skipped']}")
+    return before, count
+
+def refresh_database(chunksize: int = 50_000) -> dict:
+    """Обновление базы: полная сборка, если базы нет, иначе - загрузка только новых строк.
+
+    Возвращает число новых строк по сырым таблицам.
+    """
+    if not os.path.exists(connection.database_path()):
+        print("База данных не найдена - выполняем полную сборку")
+        for step in database.ETL_STEPS:
+            step()
+        conn = connection.get_connection('refresh')
+        record_watermarks(conn)
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in database.RAW_SOURCES}
+
+    print("\nИнкрементальное обновление базы данных...")
+    conn = connection.get_connection('refresh')
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'etl_watermarks'").fetchone():
+        # База собрана без водяных знаков (шагами database.py) - берем их из raw_*
+        record_watermarks(conn)
+    start = time.perf_counter()
+    try:
+        added = {}
+        since = {}
+        for table, path in database.RAW_SOURCES.items():
+            since[table], added[table] = _insert_new_rows(conn, table, path, chunksize)
+            print(f"   {table}: новых строк {added[table]}")
+
+        if not any(added.values()):
+            conn.commit()
+            print("Новых данных нет")
+            return added
+
+        # Затронутые животные и их сырые строки (по индексу animal_id)
+        conn.execute('DROP TABLE IF EXISTS temp.affected_animals')
+        conn.execute('''
+        CREATE TEMP TABLE affected_animals AS
+        SELECT animal_id FROM raw_intake WHERE rowid > :intake
+        UNION
+        SELECT animal_id FROM raw_outcome WHERE rowid > :outcome
+        ''', {'intake': since['raw_intake'], 'outcome': since['raw_outcome']})
+        for table in database.RAW_SOURCES:
+            conn.execute(f'DROP TABLE IF EXISTS temp.affected_{table}')
+            conn.execute(f'''
+            CREATE TEMP TABLE affected_{table} AS
+            SELECT * FROM {table} WHERE animal_id IN (SELECT animal_id FROM affected_animals)
+            ''')
+
+        # Справочники: только новые значения
+        for dimension, column, raw_column in DIMENSIONS:
+            cursor = conn.execute(f'''
+            INSERT OR IGNORE INTO {dimension} ({column})
+            SELECT {raw_column} FROM raw_intake WHERE rowid > :intake AND {raw_column} IS NOT NULL
+            UNION
+            SELECT {raw_column} FROM raw_outcome WHERE rowid > :outcome AND {raw_column} IS NOT NULL
+            ''', {'intake': since['raw_intake'], 'outcome': since['raw_outcome']})
+            print(f"   {dimension}: новых значений {cursor.rowcount}")
+
+        # unique_animals и animals - пересчет затронутых животных теми же запросами, что и при полной сборке
+        cursor = conn.execute(database.UNIQUE_ANIMALS_FILL_SQL.format(intake='affected_raw_intake',
+                                                                      outcome='affected_raw_outcome'))
+        print(f"   unique_animals: обновлено {cursor.rowcount}")
+        cursor = conn.execute(database.ANIMALS_FILL_SQL.format(
+            source='(SELECT * FROM unique_animals WHERE animal_id IN (SELECT animal_id FROM affected_animals))'))
+        print(f"   animals: обновлено {cursor.rowcount}")
+
+        # intake - только новые поступления
+        cursor = conn.execute('''
+        INSERT INTO intake (animal_id, intake_date, intake_type, intake_condition, found_location)
+        SELECT animal_id, datetime, intake_type, intake_condition, found_location
+        FROM raw_intake
+        WHERE rowid > ?
+        ''', (since['raw_intake'],))
+        print(f"   intake: добавлено {cursor.rowcount}")
+
+        # outcome - пересчет days_in_shelter затронутых животных
+        conn.execute('DELETE FROM outcome WHERE animal_id IN (SELECT animal_id FROM affected_animals)')
+        cursor = conn.execute(database.OUTCOME_FILL_SQL.format(intake='affected_raw_intake',
+                                                               outcome='affected_raw_outcome'))
+        print(f"   outcome: пересчитано {cursor.rowcount}")
+
+        conn.commit()
+        conn.execute('PRAGMA optimize')
+    except Exception as e:
+        conn.rollback()
+        print(f"Ошибка при инкрементальном обновлении: {e}")
+        raise
+    finally:
+        for name in ('affected_animals', 'affected_raw_intake', 'affected_raw_outcome'):
+            conn.execute(f'DROP TABLE IF EXISTS temp.{name}')
+
+    print(f"Обновление завершено за {time.perf_counter() - start:.2f} с")
+    return added
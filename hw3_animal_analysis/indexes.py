@@ -0,0 +1,156 @@
+"""Индексы схемы приюта и проверка планов аналитических запросов.
+
+Индексы создаются после массовой загрузки таблиц (построить индекс по готовой таблице
+быстрее, чем обновлять его на каждой вставке), затем ANALYZE собирает статистику для
+планировщика. check_query_plans разбирает EXPLAIN QUERY PLAN и находит запросы,
+которые читают большие таблицы полным сканированием или строят автоматический индекс.
+"""
+import contextlib
+import io
+import re
+import tempfile
+
+import connection
+
+# Таблица -> [(имя индекса, колонки)]
+INDEXES = {
+    # unique_animals и расчет days_in_shelter связывают сырые таблицы по animal_id,
+    # окна PARTITION BY animal_id ORDER BY datetime читают индекс без сортировки
+    'raw_intake': [('idx_raw_intake_animal', 'animal_id, datetime')],
+    'raw_outcome': [('idx_raw_outcome_animal', 'animal_id, datetime')],
+    'animals': [
+        ('idx_animals_type', 'animal_type_id'),
+        ('idx_animals_breed', 'breed_id'),
+        ('idx_animals_color', 'color_id'),
+    ],
+    'intake': [
+        ('idx_intake_animal', 'animal_id, intake_epoch'),
+        ('idx_intake_date', 'intake_date'),
+        ('idx_intake_type', 'intake_type'),
+        ('idx_intake_condition', 'intake_condition'),
+        # Календарные колонки: группировки по месяцу, сезону и часу читают только индекс
+        ('idx_intake_year_month', 'intake_year, intake_month'),
+        ('idx_intake_season', 'intake_season'),
+        ('idx_intake_hour', 'intake_hour'),
+    ],
+    'outcome': [
+        ('idx_outcome_animal', 'animal_id'),
+        ('idx_outcome_type', 'outcome_type'),
+        ('idx_outcome_days', 'days_in_shelter, animal_id'),
+        ('idx_outcome_year_month', 'outcome_year, outcome_month'),
+        ('idx_outcome_season', 'outcome_season'),
+        ('idx_outcome_hour', 'outcome_hour'),
+    ],
+}
+
+# Таблицы, полное сканирование которых считается ошибкой плана
+LARGE_TABLES = {'raw_intake', 'raw_outcome', 'unique_animals', 'animals', 'intake', 'outcome'}
+
+_SQL_KEYWORDS = {'ON', 'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'GROUP', 'ORDER', 'LIMIT',
+                 'USING', 'UNION', 'HAVING', 'WINDOW', 'NATURAL'}
+
+def create_indexes(conn, tables: list = None, analyze: bool = True) -> list:
+    """Создание индексов для таблиц (по умолчанию - всех существующих из INDEXES) и ANALYZE."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    created = []
+    for table in tables or list(INDEXES):
+        if table not in existing:
+            continue
+        for name, columns in INDEXES[table]:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+            created.append(name)
+    if analyze:
+        conn.execute('ANALYZE')
+    conn.commit()
+    print(f"Создано индексов: {len(created)}" + (", статистика обновлена (ANALYZE)" if analyze else ""))
+    return created
+
+def drop_indexes(conn, tables: list = None):
+    """Удаление индексов (например, перед повторной массовой загрузкой)."""
+    for table in tables or list(INDEXES):
+        for name, _ in INDEXES[table]:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.commit()
+
+def table_aliases(sql: str) -> dict:
+    """Псевдоним (или имя) -> таблица для FROM/JOIN запроса."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def explain(conn, sql: str) -> list:
+    """Строки EXPLAIN QUERY PLAN (поле detail)."""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+
+def plan_problems(conn, sql: str) -> list:
+    """Шаги плана с полным сканированием большой таблицы или автоматическим индексом."""
+    aliases = table_aliases(sql)
+    problems = []
+    for detail in explain(conn, sql):
+        # SQLite 3.36+: 'SCAN <псевдоним>'; раньше: 'SCAN TABLE <таблица> [AS <псевдоним>]'
+        scan = re.fullmatch(r'SCAN (?:TABLE (\w+)(?: AS \w+)?|(\w+))', detail)
+        if scan and (scan.group(1) or aliases.get(scan.group(2), scan.group(2))) in LARGE_TABLES:
+            problems.append(detail)
+        elif 'AUTOMATIC' in detail:
+            problems.append(detail)
+    return problems
+
+def check_query_plans(queries: list, conn=None, verbose: bool = True) -> dict:
+    """Проверка планов запросов; возвращает {запрос: проблемные шаги} для запросов с проблемами."""
+    conn = conn or connection.get_connection('read')
+    failures = {}
+    for sql in queries:
+        problems = plan_problems(conn, sql)
+        if problems:
+            failures[sql] = problems
+    if verbose:
+        print(f"Проверено запросов: {len(queries)}, с полным сканированием: {len(failures)}")
+        for sql, problems in failures.items():
+            print("-" * 60)
+            print(' '.join(sql.split())[:200])
+            for detail in problems:
+                print(f"   {detail}")
+    return failures
+
+def assert_query_plans(queries: list, conn=None):
+    """То же, что check_query_plans, но с AssertionError при найденных проблемах (для тестов и CI)."""
+    failures = check_query_plans(queries, conn, verbose=False)
+    if failures:
+        details = '; '.join(f"{' '.join(sql.split())[:80]}: {', '.join(problems)}"
+                            for sql, problems in failures.items())
+        raise AssertionError(f"Полное сканирование больших таблиц: {details}")
+
+def collect_queries(functions: list) -> list:
+    """SELECT-запросы, которые выполняют функции отчета (через trace callback соединения).
+
+    Функции выполняются без вывода в консоль, графики сохраняются во временный каталог.
+    """
+    import rendering
+
+    conn = connection.get_connection('read')
+    queries = []
+
+    def trace(statement):
+        if re.match(r'\s*(SELECT|WITH)\b', statement, re.IGNORECASE) and statement not in queries:
+            queries.append(statement)
+
+    conn.set_trace_callback(trace)
+    try:
+        with tempfile.TemporaryDirectory() as plots_dir, rendering.saving_to(plots_dir), \
+                contextlib.redirect_stdout(io.StringIO()):
+            for function in functions:
+                function()
+    finally:
+        conn.set_trace_callback(None)
+    return queries
+
+def check_analytics_plans() -> dict:
+    """Проверка планов всех запросов графиков и дополнительного анализа visualization.py."""
+    import visualization
+
+    functions = visualization.VISUALIZATIONS + [visualization.create_correlation_matrix,
+                                                visualization.perform_additional_analysis]
+    return check_query_plans(collect_queries(functions))
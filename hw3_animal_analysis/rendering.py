@@ -0,0 +1,95 @@
+"""Режим отрисовки графиков: интерактивный (plt.show) или сохранение в файлы без дисплея.
+
+Режим задается переменными окружения PLOT_OUTPUT_DIR (каталог для файлов) и PLOT_FORMAT
+(png или svg) либо функцией configure. Модуль нужно импортировать до matplotlib.pyplot:
+в режиме файлов он выбирает backend Agg.
+"""
+import contextlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+_config = {
+    'output_dir': os.environ.get('PLOT_OUTPUT_DIR') or None,
+    'format': os.environ.get('PLOT_FORMAT', 'png'),
+}
+
+if _config['output_dir']:
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+
+def configure(output_dir: str = None, fmt: str = 'png'):
+    """Включение (output_dir задан) или выключение режима сохранения в файлы."""
+    _config['output_dir'] = output_dir
+    _config['format'] = fmt
+    if output_dir:
+        plt.switch_backend('Agg')
+
+def is_headless() -> bool:
+    return bool(_config['output_dir'])
+
+@contextlib.contextmanager
+def saving_to(output_dir: str, fmt: str = 'png'):
+    """Временный режим сохранения в файлы; на выходе восстанавливаются прежний режим и backend."""
+    previous = (_config['output_dir'], _config['format'])
+    backend = plt.get_backend()
+    configure(output_dir, fmt)
+    try:
+        yield
+    finally:
+        configure(*previous)
+        plt.switch_backend(backend)
+
+def _figure_name(fig) -> str:
+    """Имя файла из заголовка графика."""
+    titles = [fig._suptitle.get_text()] if fig._suptitle else []
+    titles += [ax.get_title() for ax in fig.axes]
+    title = next((t for t in titles if t.strip()), 'figure')
+    return re.sub(r'\W+', '_', title).strip('_')[:80] or 'figure'
+
+def _reserve_path(name: str) -> str:
+    """Уникальный путь в каталоге вывода (файл создается сразу, чтобы процессы не конфликтовали)."""
+    os.makedirs(_config['output_dir'], exist_ok=True)
+    suffix = 1
+    while True:
+        file_name = f"{name}.{_config['format']}" if suffix == 1 else f"{name}_{suffix}.{_config['format']}"
+        path = os.path.join(_config['output_dir'], file_name)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL))
+            return path
+        except FileExistsError:
+            suffix += 1
+
+def show(name: str = None):
+    """Замена plt.show(): в режиме файлов сохраняет текущий график и сразу закрывает его."""
+    if not is_headless():
+        plt.show()
+        return None
+    fig = plt.gcf()
+    path = _reserve_path(name or _figure_name(fig))
+    fig.savefig(path, format=_config['format'], bbox_inches='tight')
+    plt.close(fig)
+    print(f"График сохранен: {path}")
+    return path
+
+def _render_task(task: tuple):
+    function = task[0]
+    args = task[1] if len(task) > 1 else ()
+    kwargs = task[2] if len(task) > 2 else {}
+    return function(*args, **kwargs)
+
+def render_parallel(tasks: list, output_dir: str = None, fmt: str = None, processes: int = None) -> list:
+    """Параллельная отрисовка независимых графиков в файлы.
+
+    tasks - список функций или кортежей (функция, args[, kwargs]); функции должны быть
+    объявлены на уровне модуля. Каждая выполняется в отдельном процессе в режиме файлов.
+    """
+    output_dir = output_dir or _config['output_dir'] or 'plots'
+    fmt = fmt or _config['format']
+    tasks = [task if isinstance(task, tuple) else (task,) for task in tasks]
+    workers = min(processes or os.cpu_count() or 1, len(tasks)) or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure, initargs=(output_dir, fmt)) as pool:
+        return list(pool.map(_render_task, tasks))
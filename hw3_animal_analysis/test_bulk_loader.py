@@ -0,0 +1,29 @@
+import sqlite3
+
+import pytest
+
+import bulk_loader
+from conftest import intake, outcome
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_bad_rows_skipped_not_fatal(tmp_path, capfd, parallel):
+    path = tmp_path / 'rows.csv'
+    path.write_text('animal_id,datetime,name\n'
+                    'A1,2015-01-01T10:00:00.000,Max\n'
+                    ',2015-01-02T10:00:00.000,NoId\n'
+                    'A3,2015-01-03T10:00:00.000\n'
+                    'A4,01/04/2015 10:00:00 AM,\n', encoding='utf-8')
+    conn = sqlite3.connect(str(tmp_path / 'test.db'))
+    counts = bulk_loader.load_csv(conn, {'raw': str(path)}, chunksize=1, parallel=parallel)
+    assert counts == {'raw': 2}
+    assert conn.execute('SELECT * FROM raw ORDER BY animal_id').fetchall() == [
+        ('A1', '2015-01-01 10:00:00', 'Max'),
+        ('A4', '2015-01-04 10:00:00', None),
+    ]
+    assert 'пропущено некорректных строк: 2' in capfd.readouterr().out
+
+def test_build_with_empty_animal_id(build_database):
+    conn = build_database([intake('A1', '2015-01-01 10:00'), intake('', '2015-01-02 10:00')],
+                          [outcome('A1', '2015-01-03 10:00'), outcome('', '2015-01-04 10:00')])
+    assert conn.execute('SELECT COUNT(*) FROM raw_intake').fetchone()[0] == 1
+    assert conn.execute('SELECT animal_id, days_in_shelter FROM outcome').fetchall() == [('A1', 2.0)]
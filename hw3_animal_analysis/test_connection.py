@@ -0,0 +1,27 @@
+import pytest
+
+import connection
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = connection.ConnectionManager(str(tmp_path / 'test.db'))
+    manager.get_connection('load').execute('CREATE TABLE t (x INTEGER)')
+    yield manager
+    manager.close()
+
+def test_phase_switch_with_open_transaction_raises(manager):
+    conn = manager.get_connection('load')
+    conn.execute('INSERT INTO t VALUES (1)')
+    with pytest.raises(RuntimeError, match='транзакции'):
+        manager.get_connection('read')
+    # Запись не потеряна: после commit этап переключается
+    conn.commit()
+    assert manager.get_connection('read').execute('SELECT x FROM t').fetchall() == [(1,)]
+
+def test_phase_switch_keeps_settings(manager):
+    conn = manager.get_connection('read')
+    assert conn.execute('PRAGMA query_only').fetchone()[0] == 1
+    conn = manager.get_connection('refresh')
+    assert conn.execute('PRAGMA query_only').fetchone()[0] == 0
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+    assert manager.get_connection('load').execute('PRAGMA synchronous').fetchone()[0] == 0
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+import database
+from conftest import intake, outcome, random_rows
+
+def stays(conn) -> list:
+    """(animal_id, outcome_date, days_in_shelter) всех выходов по порядку."""
+    return conn.execute('''
+        SELECT animal_id, outcome_date, days_in_shelter
+        FROM outcome
+        ORDER BY animal_id, outcome_date
+    ''').fetchall()
+
+def brute_force_stays(intakes: list, outcomes: list) -> list:
+    """Для каждого выхода - последнее событие животного до него; срок, если это поступление."""
+    events = ([(row['animal_id'], pd.Timestamp(row['datetime']), 0) for row in intakes] +
+              [(row['animal_id'], pd.Timestamp(row['datetime']), 1) for row in outcomes])
+    result = []
+    for animal_id, moment, kind in events:
+        if kind != 1:
+            continue
+        previous = [event for event in events
+                    if event[0] == animal_id and (event[1], event[2]) < (moment, kind)]
+        last = max(previous, key=lambda event: (event[1], event[2]), default=None)
+        days = (moment - last[1]).total_seconds() / 86400 if last and last[2] == 0 else None
+        result.append((animal_id, moment.strftime('%Y-%m-%d %H:%M:%S'), days))
+    return sorted(result)
+
+def test_repeat_visitor_keeps_every_stay(build_database):
+    conn = build_database(
+        [intake('A1', '2015-01-01 10:00'), intake('A1', '2015-03-01 10:00')],
+        [outcome('A1', '2015-01-11 10:00'), outcome('A1', '2015-03-03 22:00')],
+    )
+    assert stays(conn) == [
+        ('A1', '2015-01-11 10:00:00', pytest.approx(10.0)),
+        ('A1', '2015-03-03 22:00:00', pytest.approx(2.5)),
+    ]
+
+def test_outcome_pairs_with_latest_intake(build_database):
+    conn = build_database(
+        [intake('A1', '2015-01-01 00:00'), intake('A1', '2015-01-05 00:00')],
+        [outcome('A1', '2015-01-06 00:00')],
+    )
+    assert stays(conn) == [('A1', '2015-01-06 00:00:00', pytest.approx(1.0))]
+
+def test_same_minute_intake_and_outcome(build_database):
+    conn = build_database(
+        [intake('A1', '2015-02-01 12:00')],
+        [outcome('A1', '2015-02-01 12:00')],
+    )
+    assert stays(conn) == [('A1', '2015-02-01 12:00:00', 0.0)]
+
+def test_outcome_without_intake(build_database):
+    conn = build_database(
+        [intake('A1', '2015-01-01 00:00'), intake('A2', '2015-06-01 00:00')],
+        [outcome('A1', '2015-01-02 00:00'), outcome('A2', '2015-05-01 00:00'), outcome('A3', '2015-01-01 00:00')],
+    )
+    assert stays(conn) == [
+        ('A1', '2015-01-02 00:00:00', pytest.approx(1.0)),
+        ('A2', '2015-05-01 00:00:00', None),
+        ('A3', '2015-01-01 00:00:00', None),
+    ]
+    # Животное только с выходом тоже попадает в animals
+    assert conn.execute("SELECT COUNT(*) FROM animals WHERE animal_id = 'A3'").fetchone()[0] == 1
+
+def test_matches_brute_force_pairing(build_database):
+    intakes, outcomes = random_rows(animals=200, seed=1)
+    conn = build_database(intakes, outcomes)
+    expected = brute_force_stays(intakes, outcomes)
+    actual = stays(conn)
+    assert [row[:2] for row in actual] == [row[:2] for row in expected]
+    for (_, _, days), (_, _, expected_days) in zip(actual, expected):
+        assert days == (None if expected_days is None else pytest.approx(expected_days))
+
+def test_unique_animals_has_one_row_per_animal(build_database):
+    intakes, outcomes = random_rows(animals=100, seed=2)
+    conn = build_database(intakes, outcomes)
+    animals = {row['animal_id'] for row in intakes + outcomes}
+    assert conn.execute('SELECT COUNT(*) FROM unique_animals').fetchone()[0] == len(animals)
+    assert conn.execute('SELECT COUNT(*) FROM animals').fetchone()[0] == len(animals)
+
+def test_compare_outcome_fill(build_database):
+    intakes, outcomes = random_rows(animals=200, seed=3)
+    build_database(intakes, outcomes)
+    results = database.compare_outcome_fill(repeats=1)
+    as_of = results['as-of (LAG)']
+    # as-of соединение сохраняет каждый выход, попарное теряет выходы с несколькими поступлениями
+    assert as_of['rows'] == len(outcomes)
+    assert as_of['stays'] == sum(days is not None for _, _, days in brute_force_stays(intakes, outcomes))
+    assert all(result['seconds'] >= 0 for result in results.values())
@@ -0,0 +1,65 @@
+import pytest
+
+import connection
+import incremental
+from conftest import outcome, random_rows, write_sources
+
+# Содержимое таблиц без суррогатных ключей: id справочников зависят от порядка вставки
+SNAPSHOT_QUERIES = {
+    'unique_animals': 'SELECT * FROM unique_animals ORDER BY animal_id',
+    'animals': '''
+        SELECT a.animal_id, a.name, t.animal_type, b.breed_name, c.color_name
+        FROM animals a
+        LEFT JOIN animal_types t ON a.animal_type_id = t.type_id
+        LEFT JOIN breeds b ON a.breed_id = b.breed_id
+        LEFT JOIN colors c ON a.color_id = c.color_id
+        ORDER BY a.animal_id
+    ''',
+    'intake': '''
+        SELECT animal_id, intake_date, intake_type, intake_condition, found_location
+        FROM intake ORDER BY animal_id, intake_date
+    ''',
+    'outcome': '''
+        SELECT animal_id, outcome_date, outcome_type, outcome_subtype, days_in_shelter
+        FROM outcome ORDER BY animal_id, outcome_date
+    ''',
+    'animal_types': 'SELECT animal_type FROM animal_types ORDER BY 1',
+    'breeds': 'SELECT breed_name FROM breeds ORDER BY 1',
+    'colors': 'SELECT color_name FROM colors ORDER BY 1',
+}
+
+def snapshot(conn) -> dict:
+    return {table: conn.execute(sql).fetchall() for table, sql in SNAPSHOT_QUERIES.items()}
+
+def before(rows: list, cutoff: str) -> list:
+    return [row for row in rows if row['datetime'] < cutoff]
+
+@pytest.mark.parametrize('cutoff', ['2015-06-01', '2016-01-01'])
+def test_refresh_matches_full_build(build_database, tmp_path, cutoff):
+    intakes, outcomes = random_rows(animals=300, seed=4)
+    # Новое животное, тип и порода, которых нет до отсечки
+    outcomes.append(outcome('A999999', '2017-03-01 08:00', animal_type='Livestock', breed='Goat Mix'))
+    build_database(before(intakes, cutoff), before(outcomes, cutoff), name='incremental.db')
+
+    write_sources(tmp_path, intakes, outcomes)
+    added = incremental.refresh_database(chunksize=50)
+    assert added == {'raw_intake': len(intakes) - len(before(intakes, cutoff)),
+                     'raw_outcome': len(outcomes) - len(before(outcomes, cutoff))}
+    refreshed = snapshot(connection.get_connection('read'))
+
+    full = snapshot(build_database(intakes, outcomes, name='full.db'))
+    for table in SNAPSHOT_QUERIES:
+        assert refreshed[table] == full[table], table
+
+def test_refresh_without_new_rows(build_database, tmp_path):
+    intakes, outcomes = random_rows(animals=50, seed=5)
+    conn = build_database(intakes, outcomes)
+    expected = snapshot(conn)
+    assert incremental.refresh_database() == {'raw_intake': 0, 'raw_outcome': 0}
+    assert snapshot(connection.get_connection('read')) == expected
+
+def test_refresh_is_durable(build_database):
+    build_database(*random_rows(animals=20, seed=6))
+    conn = connection.get_connection('refresh')
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
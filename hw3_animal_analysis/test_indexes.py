@@ -0,0 +1,39 @@
+import pytest
+
+import indexes
+import visualization
+from conftest import random_rows
+
+@pytest.mark.parametrize('detail', [
+    'SCAN intake',
+    'SCAN i',
+    'SCAN TABLE intake',
+    'SCAN TABLE intake AS i',
+])
+def test_full_scan_detected_in_both_formats(monkeypatch, detail):
+    monkeypatch.setattr(indexes, 'explain', lambda conn, sql: [detail])
+    assert indexes.plan_problems(None, 'SELECT * FROM intake i') == [detail]
+
+@pytest.mark.parametrize('detail', [
+    'SEARCH intake USING INDEX idx_intake_date (intake_date>?)',
+    'SCAN i USING COVERING INDEX idx_intake_type',
+    'SCAN TABLE intake AS i USING COVERING INDEX idx_intake_type',
+    'SCAN TABLE intake_types',
+    'SCAN t',
+])
+def test_index_scans_and_small_tables_pass(monkeypatch, detail):
+    monkeypatch.setattr(indexes, 'explain', lambda conn, sql: [detail])
+    assert indexes.plan_problems(None, 'SELECT * FROM intake i JOIN intake_types t USING (intake_type)') == []
+
+def test_unindexed_filter_fails(build_database):
+    conn = build_database(*random_rows(animals=50))
+    with pytest.raises(AssertionError, match='Полное сканирование'):
+        indexes.assert_query_plans(["SELECT COUNT(*) FROM intake WHERE found_location = 'Austin (TX)'"], conn)
+
+def test_analytics_queries_use_indexes(build_database):
+    conn = build_database(*random_rows())
+    functions = visualization.VISUALIZATIONS + [visualization.create_correlation_matrix,
+                                                visualization.perform_additional_analysis]
+    queries = indexes.collect_queries(functions)
+    assert queries
+    indexes.assert_query_plans(queries, conn)
@@ -1,13 +1,14 @@
+import rendering
 import matplotlib.pyplot as plt
 import seaborn as sns
-import sqlite3
+import connection
 import pandas as pd
 import numpy as np
 
-def create_visualizations():
-    """Визуализация данных из нормализованной БД"""
+def plot_intake_types():
+    """Типы поступлений в приют"""
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('read')
 
     try:
         # Типы поступлений в приют
@@ -31,17 +32,27 @@ def create_visualizations():
             plt.text(bar.get_x() + bar.get_width()/2., height + 5,
                     f'{int(height)}', ha='center', va='bottom')
         plt.tight_layout()
-        plt.show()
+        rendering.show()
+
+    except Exception as e:
+        print(f"Ошибка при создании визуализации: {e}")
+        raise
 
+def plot_monthly_intakes():
+    """Динамика поступлений по месяцам"""
+
+    conn = connection.get_connection('read')
+
+    try:
         # Динамика поступлений по месяцам
         query = '''
         SELECT
-            strftime('%Y-%m', intake_date) as month,
+            printf('%04d-%02d', intake_year, intake_month) as month,
             COUNT(*) as count
         FROM intake
-        WHERE intake_date IS NOT NULL
-        GROUP BY month
-        ORDER BY month
+        WHERE intake_year IS NOT NULL
+        GROUP BY intake_year, intake_month
+        ORDER BY intake_year, intake_month
         '''
         df = pd.read_sql_query(query, conn)
 
@@ -56,8 +67,18 @@ def create_visualizations():
         plt.xticks(rotation=45, ha='right')
         plt.grid(True, alpha=0.3)
         plt.tight_layout()
-        plt.show()
+        rendering.show()
 
+    except Exception as e:
+        print(f"Ошибка при создании визуализации: {e}")
+        raise
+
+def plot_animal_types():
+    """Распределение животных по типам"""
+
+    conn = connection.get_connection('read')
+
+    try:
         # Распределение по типам животных
         print()
         query = '''
@@ -89,8 +110,18 @@ def create_visualizations():
                     f'{int(height)}', ha='center', va='bottom')
 
         plt.tight_layout()
-        plt.show()
+        rendering.show()
+
+    except Exception as e:
+        print(f"Ошибка при создании визуализации: {e}")
+        raise
+
+def plot_outcome_types():
+    """Распределение убытий из приюта"""
+
+    conn = connection.get_connection('read')
 
+    try:
         # Убытия из приюта (круговая диаграмма)
         print()
         # query = "SELECT outcome_type, COUNT(*) as count FROM outcome GROUP BY outcome_type"
@@ -114,8 +145,18 @@ def create_visualizations():
         plt.title('Распределение убытий из приюта\n\n', fontsize=16, fontweight='bold')
         print()
         plt.axis('equal')
-        plt.show()
+        rendering.show()
+
+    except Exception as e:
+        print(f"Ошибка при создании визуализации: {e}")
+        raise
+
+def plot_days_in_shelter():
+    """Среднее время пребывания в приюте по типам животных"""
 
+    conn = connection.get_connection('read')
+
+    try:
         # Время пребывания в приюте
         print()
         query = '''
@@ -142,20 +183,27 @@ def create_visualizations():
                     f'{height:.1f}', ha='center', va='bottom')
 
         plt.tight_layout()
-        plt.show()
-
-        print("Визуализации созданы успешно!")
+        rendering.show()
 
     except Exception as e:
-        print(f"Ошибка при создании визуализаций: {e}")
+        print(f"Ошибка при создании визуализации: {e}")
         raise
-    finally:
-        conn.close()
+
+# Независимые графики: каждый открывает свое соединение, поэтому их можно строить параллельно
+VISUALIZATIONS = [plot_intake_types, plot_monthly_intakes, plot_animal_types, plot_outcome_types, plot_days_in_shelter]
+
+def create_visualizations():
+    """Визуализация данных из нормализованной БД"""
+
+    for plot in VISUALIZATIONS:
+        plot()
+
+    print("Визуализации созданы успешно!")
 
 def create_correlation_matrix():
     """Создание матрицы корреляции для числовых данных"""
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('read')
 
     try:
         print("=" * 60)
@@ -229,7 +277,7 @@ def create_correlation_matrix():
         plt.xticks(rotation=45, ha='right')
         plt.yticks(rotation=0)
         plt.tight_layout()
-        plt.show()
+        rendering.show()
 
         # Анализ наиболее значимых корреляций
         print("\nНаиболее значимые корреляции:")
@@ -266,13 +314,11 @@ def create_correlation_matrix():
     except Exception as e:
         print(f"Ошибка при создании матрицы корреляции: {e}")
         raise
-    finally:
-        conn.close()
 
 def perform_additional_analysis():
     """Дополнительный анализ данных"""
 
-    conn = sqlite3.connect('animal_shelter.db')
+    conn = connection.get_connection('read')
 
     try:
 
@@ -295,16 +341,16 @@ def perform_additional_analysis():
         print("\nАнализ сезонности поступлений:")
         season_query = '''
         SELECT
-            CASE
-                WHEN strftime('%m', intake_date) IN ('12', '01', '02') THEN 'Зима'
-                WHEN strftime('%m', intake_date) IN ('03', '04', '05') THEN 'Весна'
-                WHEN strftime('%m', intake_date) IN ('06', '07', '08') THEN 'Лето'
-                WHEN strftime('%m', intake_date) IN ('09', '10', '11') THEN 'Осень'
+            CASE intake_season
+                WHEN 0 THEN 'Зима'
+                WHEN 1 THEN 'Весна'
+                WHEN 2 THEN 'Лето'
+                WHEN 3 THEN 'Осень'
             END as season,
             COUNT(*) as count
         FROM intake
-        WHERE intake_date IS NOT NULL
-        GROUP BY season
+        WHERE intake_season IS NOT NULL
+        GROUP BY intake_season
         ORDER BY count DESC
         '''
         season_df = pd.read_sql_query(season_query, conn)
@@ -316,14 +362,18 @@ def perform_additional_analysis():
         time_query = '''
         SELECT
             CASE
-                WHEN CAST(strftime('%H', intake_date) AS INTEGER) BETWEEN 6 AND 11 THEN 'Утро (6-12)'
-                WHEN CAST(strftime('%H', intake_date) AS INTEGER) BETWEEN 12 AND 17 THEN 'День (12-18)'
-                WHEN CAST(strftime('%H', intake_date) AS INTEGER) BETWEEN 18 AND 23 THEN 'Вечер (18-24)'
+                WHEN intake_hour BETWEEN 6 AND 11 THEN 'Утро (6-12)'
+                WHEN intake_hour BETWEEN 12 AND 17 THEN 'День (12-18)'
+                WHEN intake_hour BETWEEN 18 AND 23 THEN 'Вечер (18-24)'
                 ELSE 'Ночь (0-6)'
             END as time_of_day,
-            COUNT(*) as count
-        FROM intake
-        WHERE intake_date IS NOT NULL
+            SUM(count) as count
+        FROM (
+            -- 24 группы по часу из индекса, затем объединение в части суток
+            SELECT intake_hour, COUNT(*) as count
+            FROM intake
+            GROUP BY intake_hour
+        )
         GROUP BY time_of_day
         ORDER BY count DESC
         '''
@@ -352,8 +402,8 @@ def perform_additional_analysis():
             SELECT
                 animal_id,
                 COUNT(*) as intake_count,
-                MIN(intake_date) as first_intake,
-                MAX(intake_date) as last_intake
+                MIN(intake_epoch) as first_intake,
+                MAX(intake_epoch) as last_intake
             FROM intake
             GROUP BY animal_id
             HAVING COUNT(*) > 1
@@ -363,9 +413,9 @@ def perform_additional_analysis():
             ic.animal_id,
             a.name,
             ic.intake_count,
-            strftime('%d.%m.%Y %H:%M', ic.first_intake) as first_intake,
-            strftime('%d.%m.%Y %H:%M', ic.last_intake) as last_intake,
-            cast(JULIANDAY(ic.last_intake) - JULIANDAY(ic.first_intake) as integer) as days_between_first_last
+            strftime('%d.%m.%Y %H:%M', ic.first_intake, 'unixepoch') as first_intake,
+            strftime('%d.%m.%Y %H:%M', ic.last_intake, 'unixepoch') as last_intake,
+            (ic.last_intake - ic.first_intake) / 86400 as days_between_first_last
         FROM intake_counts ic
         JOIN animals a ON ic.animal_id = a.animal_id
         ORDER BY ic.intake_count DESC
@@ -377,6 +427,8 @@ def perform_additional_analysis():
 
     except Exception as e:
         print(f"Ошибка при дополнительном анализе: {e}")
-    finally:
-        conn.close()
 
+def render_report(output_dir: str = 'plots', fmt: str = 'png', processes: int = None):
+    """Отрисовка всех графиков в файлы параллельно (каждый график в своем процессе)."""
+    rendering.render_parallel(VISUALIZATIONS + [create_correlation_matrix], output_dir, fmt, processes)
+    print(f"Графики сохранены в {output_dir}")